@@ -0,0 +1,150 @@
+"""
+End-to-end benchmark of ``/archive`` and ``/dl setup`` against the fake Discord API.
+
+    python -m benchmarks.commands [--latency 0.05] [--limit 5] [--window 1] [--reject 2]
+
+For workloads of 10, 50 and 200 channels or DLs, each command is invoked as if by a guild admin and its
+background job awaited, and the REST calls, ``429`` responses, time spent waiting on rate limits and wall time
+are reported. ``--reject`` makes the fake reject that many of the assigned emojis with error 10014.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import discord
+
+from benchmarks.fake_discord import FakeDiscord
+from bot.extensions.archive_channels import ArchiveCategory
+from bot.emojis import supported_emojis
+from bot.extensions.dl_setup import DLSetup
+
+SIZES = (10, 50, 200)
+
+
+class RateLimitWaits(logging.Handler):
+    """Adds up the time discord.py spends sleeping on rate limits, both pre-emptively and after a 429."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.seconds = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if "rate limited" in record.msg and isinstance(record.args[-1], float):
+            self.seconds += record.args[-1]
+
+    @contextmanager
+    def installed(self):
+        logger = logging.getLogger("discord")
+        original = discord.http.Ratelimit._refresh
+
+        async def refresh(ratelimit):
+            start = time.perf_counter()
+            await original(ratelimit)
+            self.seconds += time.perf_counter() - start
+
+        discord.http.Ratelimit._refresh = refresh
+        logger.addHandler(self)
+        try:
+            yield self
+        finally:
+            logger.removeHandler(self)
+            discord.http.Ratelimit._refresh = original
+
+
+def roster(n: int, emojis: list[str]) -> bytes:
+    rows = ["First,Last,Email,Sections,Preferred,Username,Emojis,Timestamp"]
+    for i in range(n):
+        preferences = emojis[i % len(emojis)] + emojis[(i * 7 + 1) % len(emojis)]
+        rows.append(
+            f'DL{i},Leader{i:03},dl{i}@sfsu.edu,"{i + 1}, {i + 101}",,,{preferences},2024-08-{i % 28 + 1:02}T09:00:00'
+        )
+    return "\n".join(rows).encode()
+
+
+async def archive(fake: FakeDiscord, n: int) -> None:
+    source = fake.add_channel("csc215", type=4)
+    destination = fake.add_channel("archive", type=4)
+    for i in range(n):
+        fake.add_channel(f"channel-{i}", parent_id=int(source["id"]))
+
+    bot = await fake.connect()
+    guild = bot.get_guild(fake.guild_id)
+    cog = ArchiveCategory(bot)
+    try:
+        await cog.archive.callback(
+            cog,
+            fake.interaction(bot),
+            guild.get_channel(int(source["id"])),
+            guild.get_channel(int(destination["id"])),
+            "-fa24",
+        )
+        await bot.jobs.join()
+    finally:
+        await bot.http.close()
+
+
+async def dl_setup(fake: FakeDiscord, n: int, reject: int) -> None:
+    category = fake.add_channel("discussion-leaders", type=4)
+    role_channel = fake.add_channel("dl-roles")
+    # DLs share preferences (see roster), so some of them compete for the same emoji.
+    emojis = sorted(supported_emojis())[1000 : 1000 + n]
+    content = roster(n, emojis)
+    fake.unknown_emojis |= set(emojis[:reject])
+
+    bot = await fake.connect()
+    guild = bot.get_guild(fake.guild_id)
+    cog = DLSetup(bot)
+    try:
+        await cog.dl_setup.callback(
+            cog,
+            fake.interaction(bot),
+            guild.get_channel(int(category["id"])),
+            guild.get_channel(int(role_channel["id"])),
+            fake.attachment(bot._connection, "roster.csv", content),
+        )
+        await bot.jobs.join()
+    finally:
+        await bot.http.close()
+
+
+async def run(name: str, n: int, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    with RateLimitWaits().installed() as waits:
+        start = time.perf_counter()
+        try:
+            if name == "archive":
+                await archive(fake, n)
+            else:
+                await dl_setup(fake, n, args.reject)
+        finally:
+            elapsed = time.perf_counter() - start
+            await fake.stop()
+    calls = sum(fake.requests.values())
+    print(f"{name:>10} {n:>5} {calls:>10} {fake.throttled:>6} {waits.seconds:>14.2f} {elapsed:>9.2f}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s")
+    # Rate-limit time is summed over concurrent requests, so it can exceed the wall time.
+    print(f"{'command':>10} {'size':>5} {'REST calls':>10} {'429s':>6} {'rate limit (s)':>14} {'wall (s)':>9}")
+    for name in ("archive", "dl setup"):
+        for n in SIZES:
+            await run(name, n, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=5, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    parser.add_argument("--reject", type=int, default=0, help="number of emojis to reject with error 10014")
+    logging.basicConfig(level=logging.ERROR)
+    # The journal and emoji cache are written to ./data, so keep them out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+Benchmark ``assign_role_emoji`` on synthetic multi-course rosters.
+
+    python -m benchmarks.emoji_allocator
+
+Each course has its own roster; DLs across courses compete for the same emojis, as they would in a
+combined setup. The time per DL should stay flat as the roster grows.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from bot.emojis import supported_emojis
+from bot.extensions.dl_setup import DiscussionLeader, assign_role_emoji
+
+COURSES = ("215", "220", "340", "413")
+SIZES = (100, 500, 1_000, 2_000, 2_500)
+
+
+def make_roster(n: int, rng: random.Random) -> list[DiscussionLeader]:
+    pool = sorted(supported_emojis())
+    popular = pool[:50]
+    start = datetime(2024, 8, 1)
+    return [
+        DiscussionLeader(
+            {
+                "First": f"DL{i}",
+                "Last": f"CSC{COURSES[i % len(COURSES)]}",
+                "Email": f"dl{i}@sfsu.edu",
+                "Sections": str(i % 90 + 1),
+                # Everyone wants a popular emoji first, so most DLs fall through to later choices.
+                "Emojis": rng.choice(popular) + rng.choice(popular) + pool[i * 7 % len(pool)] + rng.choice(pool),
+                "Timestamp": (start + timedelta(seconds=rng.randrange(10**6))).isoformat(),
+            }
+        )
+        for i in range(n)
+    ]
+
+
+def main():
+    rng = random.Random(215)
+    print(f"{'DLs':>8} {'total (ms)':>12} {'per DL (µs)':>12} {'fallbacks':>10}")
+    for n in SIZES:
+        dls = make_roster(n, rng)
+        start = time.perf_counter()
+        try:
+            assign_role_emoji(dls)
+        except ValueError as e:
+            print(f"{n:>8} {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        fallbacks = sum(dl.role_emoji not in dl.emojis for dl in dls)
+        assert len({dl.role_emoji for dl in dls}) == n, "duplicate emoji assigned"
+        print(f"{n:>8} {elapsed * 1e3:>12.2f} {elapsed / n * 1e6:>12.2f} {fallbacks:>10}")
+
+
+if __name__ == "__main__":
+    main()
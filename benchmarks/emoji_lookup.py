@@ -0,0 +1,73 @@
+"""
+Startup cost of DL emoji parsing: the ``emoji`` package against the bundled lookup in ``bot.emojis``.
+
+    python -m benchmarks.emoji_lookup
+
+Each variant runs in a fresh interpreter with discord.py and the bot's other modules already
+imported, and reports the time and resident memory added by loading it, and by parsing the first
+roster (which is when the bundled lookup is loaded). The median of several runs is shown.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+
+SETUP = """
+import json, time
+import discord, aiohttp, bot.constants, bot.rest, bot.journal, bot.jobs
+
+def rss():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+PREFERENCES = ["🐥🎉⚾️", ":duck::tada:", "🐭🚃🍌📮", ":mouse: :cheese:", "🧑🏾‍🍼👩‍🔬"] * 40
+"""
+
+VARIANTS = {
+    "emoji package": """
+rss0, t0 = rss(), time.perf_counter()
+import emoji
+rss1, t1 = rss(), time.perf_counter()
+parsed = [[e["emoji"] for e in emoji.emoji_list(emoji.emojize(p, language="alias"))] for p in PREFERENCES]
+""",
+    "bundled lookup": """
+rss0, t0 = rss(), time.perf_counter()
+from bot.emojis import emoji_list, emojize
+rss1, t1 = rss(), time.perf_counter()
+parsed = [emoji_list(emojize(p)) for p in PREFERENCES]
+""",
+}
+
+REPORT = """
+rss2, t2 = rss(), time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "import_kib": rss1 - rss0,
+                  "parse_ms": (t2 - t1) * 1000, "parse_kib": rss2 - rss1, "parsed": parsed}))
+"""
+
+
+def measure(variant: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", SETUP + VARIANTS[variant] + REPORT], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    print(f"{'':<15} {'import (ms)':>11} {'import (KiB)':>12} {'1st parse (ms)':>14} {'1st parse (KiB)':>15}")
+    parsed = {}
+    for variant in VARIANTS:
+        runs = [measure(variant) for _ in range(RUNS)]
+        parsed[variant] = runs[0]["parsed"]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key != "parsed"}
+        print(
+            f"{variant:<15} {median['import_ms']:>11.1f} {median['import_kib']:>12.0f} "
+            f"{median['parse_ms']:>14.1f} {median['parse_kib']:>15.0f}"
+        )
+    print("Same emojis parsed:", "yes" if len({json.dumps(p) for p in parsed.values()}) == 1 else "NO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the history export against the fake Discord API.
+
+    python -m benchmarks.export [--latency 0.05] [--limit 50] [--window 1]
+
+Exports single channels of 1,000 to 50,000 messages and a category of 20 channels, reporting
+history requests, wall time, messages per second, compressed size and the peak memory allocated
+while exporting, which should not grow with the size of the channel. Every export is interrupted
+halfway once and resumed from the journal, and the file is checked to hold every message once,
+in order.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.fake_discord import FakeDiscord
+from bot.export import export_channels, export_path
+from bot.journal import Journal
+
+WORKLOADS = ((1, 1_000), (1, 10_000), (1, 50_000), (20, 1_000))
+
+
+async def run(channels: int, messages: int, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    category = fake.add_channel("csc215", type=4)
+    for i in range(channels):
+        fake.add_history(fake.add_channel(f"ask-dl{i}", parent_id=int(category["id"])), messages)
+
+    bot = await fake.connect()
+    text_channels = bot.get_guild(fake.guild_id).get_channel(int(category["id"])).text_channels
+    directory = Path("exports")
+    journal = Journal(f"export:{category['id']}")
+    try:
+        # Interrupt the export halfway, then resume it.
+        interrupted = asyncio.create_task(export_channels(text_channels, journal, directory))
+        await asyncio.sleep(messages / 200 * args.latency)
+        interrupted.cancel()
+        await asyncio.gather(interrupted, return_exceptions=True)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        await export_channels(text_channels, journal, directory)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        journal.finish()
+    finally:
+        await bot.http.close()
+        await fake.stop()
+
+    size, correct = 0, True
+    for channel in text_channels:
+        path = export_path(channel, directory)
+        size += path.stat().st_size
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        correct = correct and ids == fake.history[channel.id]
+    requests = fake.requests["GET /channels/{channel_id}/messages"]
+    total = channels * messages
+    print(
+        f"{channels:>8} {messages:>9} {requests:>8} {elapsed:>9.2f} {total / elapsed:>10.0f} "
+        f"{size / 1024:>9.0f} {peak / 1024:>9.0f} {'yes' if correct else 'NO':>8}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s")
+    print(
+        f"{'channels':>8} {'messages':>9} {'requests':>8} {'wall (s)':>9} {'msg/s':>10} {'gz (KiB)':>9} "
+        f"{'peak KiB':>9} {'resumed':>8}"
+    )
+    for channels, messages in WORKLOADS:
+        await run(channels, messages, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=50, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    logging.basicConfig(level=logging.ERROR)
+    # The journal and exports are written to the working directory, so keep them out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,539 @@
+"""
+A local stand-in for the parts of the Discord HTTP API that the cogs use.
+
+It keeps a single guild in memory and serves the guild, channel, role, member role, message, reaction,
+interaction and webhook routes, plus attachment downloads. Every route can be slowed down with a fixed ``latency``
+and is rate limited per bucket (route and major parameter) with Discord's ``X-RateLimit-*`` headers,
+answering ``429`` when a bucket is exhausted. Emojis in ``unknown_emojis`` are rejected with error
+10014, like Discord does for emojis it does not support.
+
+``connect`` returns a ``commands.Bot`` whose REST traffic goes to the fake, with the guild already
+in its cache, so cog callbacks can be awaited directly with ``interaction``.
+"""
+
+import asyncio
+import bisect
+import itertools
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import discord
+from aiohttp import web
+from discord.ext import commands
+
+from bot.guild_config import GuildConfigs
+from bot.guild_state import GuildStates
+from bot.jobs import JobRunner
+from bot.profiles import client_options
+from bot.reaction_roles import RoleIndex
+
+API = "/api/v10"
+APPLICATION_ID = 100
+BOT_ID = 101
+ADMIN_ID = 102
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly "application/json", without a charset.
+    return web.Response(
+        body=json.dumps(data).encode(), status=status, headers={"Content-Type": "application/json"} | (headers or {})
+    )
+
+
+def user_payload(user_id: int, username: str, **fields) -> dict:
+    return {
+        "id": str(user_id),
+        "username": username,
+        "discriminator": "0",
+        "avatar": None,
+        "global_name": None,
+    } | fields
+
+
+@dataclass
+class Bucket:
+    remaining: int
+    resets_at: float
+
+
+@dataclass
+class FakeDiscord:
+    latency: float = 0.0
+    # Requests allowed per bucket per window, in seconds.
+    limit: int = 5
+    window: float = 1.0
+    unknown_emojis: set[str] = field(default_factory=set)
+
+    guild_id: int = 1000
+    # Every guild by ID, with its name. ``guild_id`` is the one the helpers below default to.
+    guilds: dict[int, str] = field(default_factory=dict)
+    channels: dict[int, dict] = field(default_factory=dict)
+    roles: dict[int, dict] = field(default_factory=dict)
+    messages: dict[int, dict] = field(default_factory=dict)
+    attachments: dict[str, bytes] = field(default_factory=dict)
+    member_roles: dict[int, set[int]] = field(default_factory=dict)
+    # Message IDs of each channel's history, oldest first. Payloads are generated when requested.
+    history: dict[int, list[int]] = field(default_factory=dict)
+
+    # Successful and failed requests per route, and 429 responses.
+    requests: Counter = field(default_factory=Counter)
+    throttled: int = 0
+
+    def __post_init__(self):
+        self._ids = itertools.count(10_000)
+        self._buckets: dict[tuple, Bucket] = {}
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        # The guild of each role, since role payloads do not carry it.
+        self.role_guilds: dict[int, int] = {}
+        # Where commands are used in each guild, and so where background jobs post their status.
+        self.commands_channels: dict[int, dict] = {}
+        self.member_roles[BOT_ID] = set()
+        self.add_guild("CSC Duclings", self.guild_id)
+        self.commands_channel = self.commands_channels[self.guild_id]
+
+    # State
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add_guild(self, name: str, guild_id: int = None) -> int:
+        """Add a guild with its @everyone role, the bot's role and a commands channel. Returns its ID."""
+        guild_id = guild_id or self.next_id()
+        self.guilds[guild_id] = name
+        self.roles[guild_id] = self._role_payload(guild_id, "@everyone", position=0)
+        self.role_guilds[guild_id] = guild_id
+        self.commands_channels[guild_id] = self.add_channel("bot-commands", guild_id=guild_id)
+        # The bot's own role sits above every role it creates, so it can manage them.
+        bot_role = self.add_role("qwacker", guild_id=guild_id, position=10_000, managed=True)
+        self.member_roles[BOT_ID].add(int(bot_role["id"]))
+        return guild_id
+
+    def add_channel(self, name: str, type: int = 0, parent_id: int = None, guild_id: int = None, **fields) -> dict:
+        guild_id = guild_id or self.guild_id
+        position = sum(c["type"] == type and c["guild_id"] == str(guild_id) for c in self.channels.values())
+        channel = {
+            "id": str(self.next_id()),
+            "type": type,
+            "guild_id": str(guild_id),
+            "name": name,
+            "position": position,
+            "parent_id": str(parent_id) if parent_id else None,
+            "topic": None,
+            "nsfw": False,
+            "rate_limit_per_user": 0,
+            "permission_overwrites": [],
+        } | fields
+        self.channels[int(channel["id"])] = channel
+        return channel
+
+    def add_role(self, name: str, guild_id: int = None, **fields) -> dict:
+        guild_id = guild_id or self.guild_id
+        role_id = self.next_id()
+        position = sum(g == guild_id for g in self.role_guilds.values())
+        self.roles[role_id] = self._role_payload(role_id, name, **{"position": position} | fields)
+        self.role_guilds[role_id] = guild_id
+        return self.roles[role_id]
+
+    def add_history(self, channel: dict, n: int) -> None:
+        """Give the channel ``n`` messages from students, one a minute from the start of the semester."""
+        start = datetime(2024, 8, 26, tzinfo=timezone.utc)
+        self.history[int(channel["id"])] = [
+            discord.utils.time_snowflake(start + timedelta(minutes=i)) + i % 4096 for i in range(n)
+        ]
+
+    def _history_payload(self, channel_id: int, message_id: int) -> dict:
+        i = message_id % 4096
+        content = f"Question {i}: why does my recursion never end?"
+        message = self._message_payload(channel_id, {"content": content}, store=False)
+        message |= {
+            "id": str(message_id),
+            "author": user_payload(1_000_000 + i, f"student{i}"),
+            "timestamp": discord.utils.snowflake_time(message_id).isoformat(),
+        }
+        if i % 10 == 0:
+            url = f"{self.url}/attachments/stacktrace.png"
+            message["attachments"] = [
+                {"id": str(message_id), "filename": "stacktrace.png", "size": 48_213, "url": url, "proxy_url": url}
+            ]
+        if i % 3 == 0:
+            message["reactions"] = [{"emoji": {"id": None, "name": "👍"}, "count": i % 7 + 1, "me": False}]
+        return message
+
+    def _role_payload(self, role_id: int, name: str, position: int, **fields) -> dict:
+        return {
+            "id": str(role_id),
+            "name": name,
+            "color": 0,
+            "hoist": False,
+            "position": position,
+            "permissions": "0",
+            "managed": False,
+            "mentionable": False,
+            "flags": 0,
+        } | fields
+
+    def guild_payload(self, guild_id: int = None) -> dict:
+        """The guild as it would arrive in a GUILD_CREATE event."""
+        guild_id = guild_id or self.guild_id
+        return {
+            "id": str(guild_id),
+            "name": self.guilds[guild_id],
+            "owner_id": str(ADMIN_ID),
+            "member_count": 2,
+            "features": [],
+            "emojis": [],
+            "stickers": [],
+            "roles": [r for r in self.roles.values() if self.role_guilds[int(r["id"])] == guild_id],
+            "channels": [c for c in self.channels.values() if c["guild_id"] == str(guild_id)],
+            "members": [self._member_payload(BOT_ID)],
+            "voice_states": [],
+            "presences": [],
+        }
+
+    # Server
+
+    async def start(self) -> str:
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes(
+            [
+                web.get(f"{API}/users/@me", self.get_me),
+                web.get(f"{API}/guilds/{{guild_id}}", self.get_guild),
+                web.get(f"{API}/guilds/{{guild_id}}/channels", self.get_channels),
+                web.post(f"{API}/guilds/{{guild_id}}/channels", self.create_channel),
+                web.patch(f"{API}/guilds/{{guild_id}}/channels", self.bulk_channel_update),
+                web.get(f"{API}/guilds/{{guild_id}}/roles", self.get_roles),
+                web.post(f"{API}/guilds/{{guild_id}}/roles", self.create_role),
+                web.patch(f"{API}/guilds/{{guild_id}}/roles/{{role_id}}", self.edit_role),
+                web.delete(f"{API}/guilds/{{guild_id}}/roles/{{role_id}}", self.delete_role),
+                web.get(f"{API}/guilds/{{guild_id}}/members", self.get_members),
+                web.patch(f"{API}/guilds/{{guild_id}}/members/{{user_id}}", self.edit_member),
+                web.put(f"{API}/guilds/{{guild_id}}/members/{{user_id}}/roles/{{role_id}}", self.add_member_role),
+                web.delete(f"{API}/guilds/{{guild_id}}/members/{{user_id}}/roles/{{role_id}}", self.remove_member_role),
+                web.patch(f"{API}/channels/{{channel_id}}", self.edit_channel),
+                web.delete(f"{API}/channels/{{channel_id}}", self.delete_channel),
+                web.post(f"{API}/channels/{{channel_id}}/messages", self.send_message),
+                web.get(f"{API}/channels/{{channel_id}}/messages", self.get_messages),
+                web.get(f"{API}/channels/{{channel_id}}/messages/{{message_id}}", self.get_message),
+                web.patch(f"{API}/channels/{{channel_id}}/messages/{{message_id}}", self.edit_message),
+                web.put(
+                    f"{API}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}/@me", self.add_reaction
+                ),
+                web.delete(f"{API}/channels/{{channel_id}}/messages/{{message_id}}/reactions", self.clear_reactions),
+                web.delete(
+                    f"{API}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}", self.clear_reactions
+                ),
+                web.post(f"{API}/interactions/{{interaction_id}}/{{token}}/callback", self.interaction_callback),
+                web.post(f"{API}/webhooks/{{application_id}}/{{token}}", self.send_followup),
+                web.patch(f"{API}/webhooks/{{application_id}}/{{token}}/messages/{{message_id}}", self.edit_followup),
+                web.get("/attachments/{name}", self.get_attachment),
+            ]
+        )
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path.startswith("/attachments"):
+            return await handler(request)
+        route = f"{request.method} {request.match_info.route.resource.canonical.removeprefix(API)}"
+
+        await asyncio.sleep(self.latency)
+        info = request.match_info
+        major = info.get("channel_id") or info.get("guild_id") or info.get("token")
+        key = (route, major)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None or now >= bucket.resets_at:
+            bucket = self._buckets[key] = Bucket(self.limit, now + self.window)
+
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Reset": str(time.time() + bucket.resets_at - now),
+            "X-RateLimit-Reset-After": f"{bucket.resets_at - now:.3f}",
+            "X-RateLimit-Bucket": f"{abs(hash(route)):x}",
+        }
+        if bucket.remaining <= 0:
+            self.throttled += 1
+            headers |= {"X-RateLimit-Remaining": "0", "Retry-After": f"{bucket.resets_at - now:.3f}", "Via": "1.1 fake"}
+            body = {"message": "You are being rate limited.", "retry_after": bucket.resets_at - now, "global": False}
+            return json_response(body, status=429, headers=headers)
+
+        bucket.remaining -= 1
+        headers["X-RateLimit-Remaining"] = str(bucket.remaining)
+        self.requests[route] += 1
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def _json(self, request: web.Request) -> dict:
+        if request.content_type.startswith("multipart/"):
+            async for part in await request.multipart():
+                if part.name == "payload_json":
+                    return json.loads(await part.text())
+            return {}
+        if request.can_read_body:
+            return await request.json()
+        return {}
+
+    @staticmethod
+    def _error(status: int, code: int, message: str) -> web.Response:
+        return json_response({"code": code, "message": message}, status=status)
+
+    # Routes
+
+    async def get_me(self, request):
+        return json_response(user_payload(BOT_ID, "qwacker", bot=True, verified=True, mfa_enabled=False))
+
+    async def get_guild(self, request):
+        guild = self.guild_payload(int(request.match_info["guild_id"]))
+        return json_response({k: v for k, v in guild.items() if k not in ("channels", "members")})
+
+    async def get_channels(self, request):
+        return json_response(self.guild_payload(int(request.match_info["guild_id"]))["channels"])
+
+    async def get_roles(self, request):
+        return json_response(self.guild_payload(int(request.match_info["guild_id"]))["roles"])
+
+    async def create_channel(self, request):
+        data = await self._json(request)
+        channel = self.add_channel(
+            data["name"].lower().replace(" ", "-"),
+            type=data.get("type", 0),
+            parent_id=data.get("parent_id"),
+            guild_id=int(request.match_info["guild_id"]),
+            topic=data.get("topic"),
+            permission_overwrites=data.get("permission_overwrites", []),
+        )
+        return json_response(channel)
+
+    async def bulk_channel_update(self, request):
+        for update in await self._json(request):
+            channel = self.channels[int(update["id"])]
+            channel["position"] = update["position"]
+            if "parent_id" in update:
+                channel["parent_id"] = update["parent_id"]
+        return web.Response(status=204)
+
+    def _member_payload(self, user_id: int) -> dict:
+        return {
+            "user": user_payload(user_id, "qwacker" if user_id == BOT_ID else f"student{user_id}"),
+            "roles": [str(role_id) for role_id in sorted(self.member_roles[user_id])],
+            "joined_at": "2024-08-26T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+
+    async def get_members(self, request):
+        limit = int(request.query.get("limit", 1))
+        after = int(request.query.get("after", 0))
+        user_ids = sorted(user_id for user_id in self.member_roles if user_id > after)[:limit]
+        return json_response([self._member_payload(user_id) for user_id in user_ids])
+
+    async def edit_member(self, request):
+        user_id = int(request.match_info["user_id"])
+        if user_id not in self.member_roles:
+            return self._error(404, 10007, "Unknown Member")
+        data = await self._json(request)
+        if "roles" in data:
+            self.member_roles[user_id] = {int(role_id) for role_id in data["roles"]}
+        return json_response(self._member_payload(user_id))
+
+    async def add_member_role(self, request):
+        role_id = int(request.match_info["role_id"])
+        if role_id not in self.roles:
+            return self._error(404, 10011, "Unknown Role")
+        self.member_roles.setdefault(int(request.match_info["user_id"]), set()).add(role_id)
+        return web.Response(status=204)
+
+    async def remove_member_role(self, request):
+        role_id = int(request.match_info["role_id"])
+        if role_id not in self.roles:
+            return self._error(404, 10011, "Unknown Role")
+        self.member_roles.setdefault(int(request.match_info["user_id"]), set()).discard(role_id)
+        return web.Response(status=204)
+
+    async def edit_channel(self, request):
+        channel = self.channels.get(int(request.match_info["channel_id"]))
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        data = await self._json(request)
+        if "name" in data:
+            data["name"] = data["name"].lower().replace(" ", "-")
+        channel.update({k: v for k, v in data.items() if k in channel})
+        return json_response(channel)
+
+    async def delete_channel(self, request):
+        channel = self.channels.pop(int(request.match_info["channel_id"]), None)
+        return json_response(channel) if channel else self._error(404, 10003, "Unknown Channel")
+
+    async def create_role(self, request):
+        data = await self._json(request)
+        role = self.add_role(data.get("name", "new role"), guild_id=int(request.match_info["guild_id"]))
+        role["color"] = data.get("color", 0)
+        return json_response(role)
+
+    async def edit_role(self, request):
+        role = self.roles.get(int(request.match_info["role_id"]))
+        if role is None:
+            return self._error(404, 10011, "Unknown Role")
+        role.update({k: v for k, v in (await self._json(request)).items() if k in role})
+        return json_response(role)
+
+    async def delete_role(self, request):
+        role = self.roles.pop(int(request.match_info["role_id"]), None)
+        for roles in self.member_roles.values():
+            roles.discard(int(request.match_info["role_id"]))
+        return web.Response(status=204) if role else self._error(404, 10011, "Unknown Role")
+
+    def _message_payload(self, channel_id: int, data: dict, author_id: int = BOT_ID, store: bool = True) -> dict:
+        message = {
+            "id": str(self.next_id()),
+            "channel_id": str(channel_id),
+            "author": user_payload(author_id, "qwacker", bot=True),
+            "content": data.get("content") or "",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": data.get("embeds") or [],
+            "pinned": False,
+            "type": 0,
+            "reactions": [],
+        }
+        if store:
+            self.messages[int(message["id"])] = message
+        return message
+
+    async def get_messages(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        history = self.history.get(channel_id, [])
+        limit = int(request.query.get("limit", 50))
+        if "after" in request.query:
+            i = bisect.bisect_right(history, int(request.query["after"]))
+            page = history[i : i + limit]
+        else:
+            i = bisect.bisect_left(history, int(request.query.get("before", 1 << 63)))
+            page = history[max(0, i - limit) : i]
+        # Newest first, like Discord.
+        return json_response([self._history_payload(channel_id, message_id) for message_id in reversed(page)])
+
+    async def send_message(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.channels:
+            return self._error(404, 10003, "Unknown Channel")
+        return json_response(self._message_payload(channel_id, await self._json(request)))
+
+    async def get_message(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        return json_response(message) if message else self._error(404, 10008, "Unknown Message")
+
+    async def edit_message(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        if message is None:
+            return self._error(404, 10008, "Unknown Message")
+        message.update({k: v for k, v in (await self._json(request)).items() if k in message})
+        return json_response(message)
+
+    async def add_reaction(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        if message is None:
+            return self._error(404, 10008, "Unknown Message")
+        emoji = request.match_info["emoji"]
+        if emoji in self.unknown_emojis:
+            return self._error(400, 10014, "Unknown Emoji")
+        if not any(r["emoji"]["name"] == emoji for r in message["reactions"]):
+            message["reactions"].append({"count": 1, "me": True, "emoji": {"id": None, "name": emoji}})
+        return web.Response(status=204)
+
+    async def clear_reactions(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        if message is None:
+            return self._error(404, 10008, "Unknown Message")
+        emoji = request.match_info.get("emoji")
+        message["reactions"] = [r for r in message["reactions"] if emoji and r["emoji"]["name"] != emoji]
+        return web.Response(status=204)
+
+    async def interaction_callback(self, request):
+        return web.Response(status=204)
+
+    async def send_followup(self, request):
+        return json_response(self._message_payload(0, await self._json(request)))
+
+    async def edit_followup(self, request):
+        return json_response(self._message_payload(0, await self._json(request)))
+
+    async def get_attachment(self, request):
+        return web.Response(body=self.attachments[request.match_info["name"]], content_type="text/csv")
+
+    # Client side
+
+    def attachment(self, state, name: str, content: bytes) -> discord.Attachment:
+        """Serve ``content`` as an uploaded file and return it as an attachment."""
+        self.attachments[name] = content
+        url = f"{self.url}/attachments/{name}"
+        data = {"id": str(self.next_id()), "filename": name, "size": len(content), "url": url, "proxy_url": url}
+        return discord.Attachment(data=data, state=state)
+
+    def interaction(self, bot: commands.Bot, guild_id: int = None) -> discord.Interaction:
+        """A slash command interaction from the guild owner."""
+        guild_id = guild_id or self.guild_id
+        data = {
+            "id": str(self.next_id()),
+            "application_id": str(APPLICATION_ID),
+            "type": 2,
+            "token": f"token-{self.next_id()}",
+            "version": 1,
+            "guild_id": str(guild_id),
+            "channel_id": self.commands_channels[guild_id]["id"],
+            "channel": self.commands_channels[guild_id],
+            "member": {
+                "user": user_payload(ADMIN_ID, "admin"),
+                "roles": [],
+                "joined_at": "2021-01-25T00:00:00+00:00",
+                "deaf": False,
+                "mute": False,
+                "flags": 0,
+                "permissions": "8",
+            },
+            "data": {"id": "1", "name": "command", "type": 1},
+            "locale": "en-US",
+            "guild_locale": "en-US",
+        }
+        return discord.Interaction(data=data, state=bot._connection)
+
+    async def connect(self, **options) -> commands.Bot:
+        """A bot that talks to this server, with the guilds in its cache as if they came from the gateway."""
+        discord.http.Route.BASE = self.url + API
+        bot = commands.Bot(command_prefix="/", **client_options("lean") | options)
+        await bot._async_setup_hook()
+        data = await bot.http.static_login("fake-token")
+        bot._connection.user = discord.ClientUser(state=bot._connection, data=data)
+        bot._connection.application_id = APPLICATION_ID
+        bot.jobs = JobRunner()
+        bot.reaction_roles = RoleIndex()
+        bot.guild_state = GuildStates()
+        bot.guild_config = GuildConfigs()
+        for guild_id in self.guilds:
+            self.refresh(bot, guild_id)
+        return bot
+
+    def refresh(self, bot: commands.Bot, guild_id: int = None) -> discord.Guild:
+        """Replace the bot's cached guild with the current state, as gateway events would."""
+        return bot._connection._add_guild_from_data(self.guild_payload(guild_id))
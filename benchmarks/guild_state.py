@@ -0,0 +1,123 @@
+"""
+Cost of checking a ``/dl setup`` roster for conflicts, against the fake Discord API.
+
+    python -m benchmarks.guild_state [--latency 0.05] [--dls 200]
+
+A guild with up to Discord's limit of 500 channels and 250 roles is checked for DL roles and
+ask-channels that already exist, three ways: fetching the channels and roles over REST, scanning
+discord.py's guild cache for every DL, and looking them up in the guild state index. Building,
+snapshotting and loading the index, and the ``fetch_guild`` call ``on_ready`` used to make, are
+timed too. Each check must find the same conflicts.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import discord
+
+from benchmarks.fake_discord import FakeDiscord
+from bot.extensions.dl_setup import DiscussionLeader, setup_conflicts
+from bot.guild_state import GuildStates, channel_name
+from bot.journal import Journal
+
+SIZES = ((100, 50), (500, 250))  # (channels, roles)
+CATEGORIES = 20
+
+
+def roster(n: int) -> list[DiscussionLeader]:
+    return [
+        DiscussionLeader({"First": f"DL{i}", "Last": "Duck", "Email": f"dl{i}@sfsu.edu", "Sections": str(i)})
+        for i in range(n)
+    ]
+
+
+def scan(dls: list[DiscussionLeader], category: discord.CategoryChannel) -> list[str]:
+    """The same check as ``setup_conflicts``, with a linear search of the cache for every DL."""
+    conflicts = []
+    for dl in dls:
+        if discord.utils.get(category.guild.roles, name=dl.role_name):
+            conflicts.append(dl.email)
+        if discord.utils.get(category.text_channels, name=channel_name(dl.ask_channel_name)):
+            conflicts.append(dl.email)
+    return conflicts
+
+
+def timed(f, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return result, (time.perf_counter() - start) / repeat
+
+
+async def run(channels: int, roles: int, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency)
+    await fake.start()
+    categories = [int(fake.add_channel(f"Category {i}", type=4)["id"]) for i in range(CATEGORIES)]
+    category_id = categories[0]
+    # One in ten DLs of the roster already has a role, and one in ten a channel, in the setup's category.
+    for i in range(channels - CATEGORIES):
+        name = f"❓ask-dl{i}" if i < args.dls and i % 10 == 0 else f"channel-{i}"
+        fake.add_channel(name, parent_id=category_id if i < args.dls else categories[i % CATEGORIES])
+    for i in range(roles):
+        fake.add_role(f"Team DL{i + 5}" if i < args.dls and i % 10 == 0 else f"Role {i}")
+    bot = await fake.connect()
+    guild = bot.get_guild(fake.guild_id)
+    category = guild.get_channel(category_id)
+    dls = roster(args.dls)
+    journal = Journal("benchmark")
+    rows = []
+
+    try:
+        start = time.perf_counter()
+        await bot.fetch_guild(guild.id)
+        rows.append(("fetch_guild (on_ready)", time.perf_counter() - start, "-"))
+
+        start = time.perf_counter()
+        fetched_channels, fetched_roles = await guild.fetch_channels(), await guild.fetch_roles()
+        elapsed = time.perf_counter() - start
+        conflicts = sum(r.name in {dl.role_name for dl in dls} for r in fetched_roles)
+        names = {channel_name(dl.ask_channel_name) for dl in dls}
+        conflicts += sum(c.name in names and c.category_id == category_id for c in fetched_channels)
+        rows.append(("fetch channels and roles", elapsed, conflicts))
+
+        found, elapsed = timed(lambda: scan(dls, category), repeat=20)
+        rows.append(("scan discord.py cache", elapsed, len(found)))
+
+        states = GuildStates()
+        state, elapsed = timed(lambda: states[guild])
+        rows.append(("build index", elapsed, "-"))
+        found, elapsed = timed(lambda: setup_conflicts(dls, category, state, journal), repeat=20)
+        rows.append(("look up index", elapsed, len(found)))
+
+        _, elapsed = timed(lambda: states.save(guild.id))
+        size = states.path(guild.id).stat().st_size
+        rows.append((f"save snapshot ({size / 1024:.0f} KiB)", elapsed, "-"))
+        _, elapsed = timed(lambda: GuildStates().get(guild.id))
+        rows.append(("load snapshot", elapsed, "-"))
+    finally:
+        await bot.http.close()
+        await fake.stop()
+
+    for label, elapsed, conflicts in rows:
+        print(f"{channels:>8} {roles:>5} {label:>26} {elapsed * 1e6:>12.0f} {conflicts:>9}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.dls} DLs")
+    print(f"{'channels':>8} {'roles':>5} {'':>26} {'time (µs)':>12} {'conflicts':>9}")
+    for channels, roles in SIZES:
+        await run(channels, roles, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--dls", type=int, default=200, help="DLs in the roster")
+    logging.basicConfig(level=logging.ERROR)
+    # Snapshots and the journal are written to ./data, so keep them out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
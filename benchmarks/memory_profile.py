@@ -0,0 +1,138 @@
+"""
+Compare resident memory of the runtime profiles in ``bot/profiles.py`` under a stream of message events.
+
+    python -m benchmarks.memory_profile
+
+Each profile runs in its own process. A guild with channels is loaded as if it came from the gateway,
+followed by a stream of message events; events are only delivered when the profile subscribes to their
+intent, as Discord would. The difference measured is the message events and the message cache: neither
+profile has the members intent, so both drop the guild's members and cache only the bot itself.
+
+Reports the RSS growth over an empty client, the memory still allocated after garbage collection,
+the cached members and messages, and the time spent processing events (inflated by tracemalloc).
+"""
+
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+MEMBERS = 5_000
+CHANNELS = 200
+MESSAGES = 20_000
+GUILD_ID = 1_000_000
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def user(i: int) -> dict:
+    return {"id": str(10_000_000 + i), "username": f"duckling{i}", "discriminator": "0", "avatar": None}
+
+
+def member(i: int) -> dict:
+    return {
+        "user": user(i),
+        "roles": [],
+        "joined_at": "2024-08-26T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def guild_payload() -> dict:
+    channels = [
+        {"id": str(GUILD_ID + 1 + i), "type": 0, "name": f"channel-{i}", "position": i} for i in range(CHANNELS)
+    ]
+    return {
+        "id": str(GUILD_ID),
+        "name": "CSC Duclings",
+        "owner_id": str(10_000_000),
+        "member_count": MEMBERS,
+        "large": True,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0}],
+        "channels": channels,
+        "members": [member(i) for i in range(MEMBERS)],
+        "voice_states": [],
+        "presences": [],
+    }
+
+
+def message_payload(i: int) -> dict:
+    return {
+        "id": str(2_000_000_000 + i),
+        "channel_id": str(GUILD_ID + 1 + i % CHANNELS),
+        "guild_id": str(GUILD_ID),
+        "author": user(i % MEMBERS),
+        "member": {k: v for k, v in member(i % MEMBERS).items() if k != "user"},
+        "content": "Does anyone know when the next discussion section is? " * 5,
+        "timestamp": "2024-09-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+async def measure(profile: str) -> None:
+    import discord
+
+    from bot.profiles import client_options
+
+    client = discord.Client(**client_options(profile))
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user(0) | {"bot": True})
+    gc.collect()
+    baseline = rss_mib()
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    state.parse_guild_create(guild_payload())
+    events = 0
+    if state._intents.guild_messages:
+        for i in range(MESSAGES):
+            state.parse_message_create(message_payload(i))
+            events += 1
+    await asyncio.sleep(0)  # let dispatched event tasks finish
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] / 2**20
+    guild = client.get_guild(GUILD_ID)
+    cached = len(state._messages or [])
+    print(f"{profile} {rss_mib() - baseline:.1f} {retained:.2f} {len(guild.members)} {cached} {events} {elapsed:.2f}")
+
+
+def main():
+    print(f"Synthetic guild: {MEMBERS} members, {CHANNELS} channels, {MESSAGES} messages")
+    print(
+        f"{'profile':>8} {'RSS (MiB)':>10} {'retained (MiB)':>15} {'members':>8} {'messages':>9} "
+        f"{'events':>7} {'CPU (s)':>8}"
+    )
+    for profile in ("default", "lean"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory_profile", profile], capture_output=True, text=True, check=True
+        )
+        name, rss, retained, members, messages, events, elapsed = out.stdout.split()
+        print(f"{name:>8} {rss:>10} {retained:>15} {members:>8} {messages:>9} {events:>7} {elapsed:>8}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        asyncio.run(measure(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,126 @@
+"""
+Memory and job throughput of one bot serving 1, 10 and 50 guilds, against the fake Discord API.
+
+    python -m benchmarks.multi_guild [--latency 0.05] [--limit 5] [--window 1]
+
+Every guild has two course categories of 20 channels and a config file. The memory column is what
+``tracemalloc`` traces for a bot connected to the guilds, with every guild cached, indexed,
+configured and with its commands copied. Then every guild archives both categories at once, as at
+the end of a semester, with job slots shared by all guilds (as before jobs were scheduled per
+guild) and with each guild having its own slots. The wall time until every job finished and the
+archived channels per second are reported.
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.fake_discord import FakeDiscord
+from bot.constants import Bot as BotConfig
+from bot.extensions.archive_channels import ArchiveCategory
+from bot.extensions.dl_setup import DLSetup
+from bot.extensions.rules import Rules
+from bot.guild_config import GuildConfigs
+
+SIZES = (1, 10, 50)
+CATEGORIES = ("csc215", "csc220")
+CHANNELS = 20
+
+
+def add_guild(fake: FakeDiscord, guild_id: int, config_dir: Path) -> None:
+    categories = {}
+    for name in CATEGORIES:
+        category = int(fake.add_channel(name.upper(), type=4, guild_id=guild_id)["id"])
+        for i in range(CHANNELS):
+            fake.add_channel(f"{name}-channel-{i}", parent_id=category, guild_id=guild_id)
+        categories[name] = category
+    categories["archive"] = int(fake.add_channel("ARCHIVE", type=4, guild_id=guild_id)["id"])
+    for i in range(20):
+        fake.add_role(f"Team DL{i}", guild_id=guild_id)
+    lines = [f'name = "Server {guild_id}"', "[categories]", *(f"{k} = {v}" for k, v in categories.items())]
+    (config_dir / f"{guild_id}.toml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+async def run(n: int, per_guild: bool, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    config_dir = Path(tempfile.mkdtemp(prefix="guilds-", dir="."))
+    add_guild(fake, fake.guild_id, config_dir)
+    for i in range(n - 1):
+        add_guild(fake, fake.add_guild(f"Server {i}"), config_dir)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    bot = await fake.connect()
+    bot.guild_config = GuildConfigs(config_dir)
+    cog = ArchiveCategory(bot)
+    for extra in (cog, Rules(bot), DLSetup(bot)):
+        await bot.add_cog(extra)
+    for guild in bot.guilds:
+        bot.guild_state[guild]
+        bot.guild_config.get(guild.id)
+        bot.tree.copy_global_to(guild=guild)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    if not per_guild:
+        shared = asyncio.Semaphore(BotConfig.job_concurrency)
+        bot.jobs._slots = defaultdict(lambda: shared)
+
+    try:
+        commands = []
+        for guild in bot.guilds:
+            config = bot.guild_config.get(guild.id)
+            destination = guild.get_channel(config.categories["archive"])
+            for name in CATEGORIES:
+                source = guild.get_channel(config.categories[name])
+                commands.append(
+                    cog.archive.callback(cog, fake.interaction(bot, guild.id), source, destination, "-fa24", False)
+                )
+        start = time.perf_counter()
+        # Admins of every guild run their commands at the same time.
+        await asyncio.gather(*commands)
+        await bot.jobs.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        await bot.http.close()
+        await fake.stop()
+
+    jobs = list(bot.jobs.jobs.values())
+    failed = sum(job.status != "done" for job in jobs)
+    archived = len(jobs) * CHANNELS
+    print(
+        f"{n:>6} {'per guild' if per_guild else 'shared':>9} {memory / 1024:>12.0f} {memory / 1024 / n:>12.1f} "
+        f"{len(jobs):>5} {elapsed:>9.2f} {archived / elapsed:>11.1f} {failed:>6}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s")
+    print(
+        f"{'guilds':>6} {'job slots':>9} {'memory (KiB)':>12} {'KiB / guild':>12} {'jobs':>5} {'wall (s)':>9} "
+        f"{'channels/s':>11} {'failed':>6}"
+    )
+    for n in SIZES:
+        for per_guild in (False, True):
+            await run(n, per_guild, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=5, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    logging.basicConfig(level=logging.ERROR)
+    # Journals and guild configs are written to the working directory, so keep them out of the tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Throughput of the reaction-role engine under a burst of reactions, against the fake Discord API.
+
+    python -m benchmarks.reaction_roles [--latency 0.05] [--limit 50] [--window 1] [--burst 10]
+
+Students react to a DL role message over ``--burst`` seconds, as in the first week of a semester.
+One in ten removes their reaction right away and one in ten also re-adds it, so the events include
+quick toggles. Each burst is run with and without holding changes back (``delay`` 1s and 0s), and
+the role API calls, ``429`` responses, time to apply every change after the last reaction and events
+per second are reported. The final roles are checked against what the reactions asked for.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+import discord
+
+from benchmarks.commands import RateLimitWaits
+from benchmarks.fake_discord import FakeDiscord
+from bot.extensions.reaction_roles import ReactionRoles
+from bot.reaction_roles import RoleQueue
+
+SIZES = (100, 250, 500)
+DELAYS = (0.0, 1.0)
+EMOJIS = ("🍇", "🍈", "🍉", "🍊", "🍋", "🍌", "🍍", "🥭", "🍎", "🍏", "🍐", "🍑", "🍒", "🍓", "🫐", "🥝")
+STUDENT_IDS = 1_000_000
+
+
+def burst(n: int, seconds: float, rng: random.Random) -> list[tuple[float, int, str, bool]]:
+    """Returns ``(at, user_id, emoji, add)`` reaction events, sorted by time."""
+    events = []
+    for user_id in range(STUDENT_IDS, STUDENT_IDS + n):
+        at, emoji = rng.uniform(0, seconds), rng.choice(EMOJIS)
+        events.append((at, user_id, emoji, True))
+        if (kind := rng.random()) < 0.2:
+            events.append((at + 0.3, user_id, emoji, False))
+            if kind < 0.1:
+                events.append((at + 0.6, user_id, emoji, True))
+    return sorted(events)
+
+
+async def run(n: int, delay: float, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    channel = fake.add_channel("dl-roles")
+    roles = {emoji: int(fake.add_role(f"Team {emoji}")["id"]) for emoji in EMOJIS}
+    message_id = fake.next_id()
+    events = burst(n, args.burst, random.Random(n))
+
+    bot = await fake.connect()
+    bot.reaction_roles.bind(message_id, roles)
+    cog = ReactionRoles(bot)
+    cog.queue = RoleQueue(bot.http, delay=delay)
+    with RateLimitWaits().installed():
+        start = time.perf_counter()
+        try:
+            for at, user_id, emoji, add in events:
+                await asyncio.sleep(start + at - time.perf_counter())
+                data = {
+                    "message_id": message_id,
+                    "channel_id": channel["id"],
+                    "user_id": user_id,
+                    "guild_id": fake.guild_id,
+                }
+                payload = discord.RawReactionActionEvent(
+                    data, discord.PartialEmoji(name=emoji), "REACTION_ADD" if add else "REACTION_REMOVE"
+                )
+                await (cog.on_raw_reaction_add if add else cog.on_raw_reaction_remove)(payload)
+            last = time.perf_counter()
+            await cog.queue.join()
+            elapsed = time.perf_counter() - start
+            drain = time.perf_counter() - last
+        finally:
+            await bot.http.close()
+            await fake.stop()
+
+    expected: dict[int, set[int]] = {}
+    for _, user_id, emoji, add in events:
+        (expected.setdefault(user_id, set()).add if add else expected.setdefault(user_id, set()).discard)(roles[emoji])
+    correct = all(fake.member_roles.get(user_id, set()) == want for user_id, want in expected.items())
+
+    calls = sum(count for route, count in fake.requests.items() if "/members/" in route)
+    print(
+        f"{n:>8} {len(events):>7} {delay:>6.1f} {calls:>10} {fake.throttled:>6} {drain:>10.2f} "
+        f"{len(events) / elapsed:>11.1f} {'yes' if correct else 'NO':>8}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s, {args.burst}s bursts")
+    print(
+        f"{'students':>8} {'events':>7} {'delay':>6} {'role calls':>10} {'429s':>6} {'drain (s)':>10} "
+        f"{'events/s':>11} {'correct':>8}"
+    )
+    for n in SIZES:
+        for delay in DELAYS:
+            await run(n, delay, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=50, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    parser.add_argument("--burst", type=float, default=10.0, help="seconds over which the students react")
+    logging.basicConfig(level=logging.ERROR)
+    # The reaction-role index is written to ./data, so keep it out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Parse time of the streamed DL roster CSV parser, checked against ``csv.DictReader`` on the whole file.
+
+    python -m benchmarks.roster_csv
+
+Rosters of 200 to 20,000 rows are fed to ``parse_csv`` line by line, as they arrive from the CDN,
+plain and with the shapes that used to trip up the parser: stray quotes inside unquoted fields
+(``O"Neil``) and quoted fields spanning lines. Each must yield the same DLs as ``csv.DictReader``
+with no errors. A roster whose last quoted field is never closed must report an error.
+"""
+
+import asyncio
+import csv
+import io
+import time
+from collections.abc import AsyncIterator
+
+from bot.extensions.dl_setup import DiscussionLeader, parse_csv
+
+SIZES = (200, 2_000, 20_000)
+HEADER = "First,Last,Email,Sections,Preferred,Username,Emojis,Timestamp"
+
+
+def roster(n: int, case: str) -> str:
+    rows = [HEADER]
+    for i in range(n):
+        last = f"Leader{i}"
+        if case == "stray quotes" and i % 10 == 0:
+            last = f'O"Neil{i}'
+        elif case == "multi-line fields" and i % 10 == 0:
+            last = f'"Leader\n{i}"'
+        rows.append(f'DL{i},{last},dl{i}@sfsu.edu,"{i + 1}, {i + 101}",,,:duck:,2024-08-01T09:00:00')
+    return "\n".join(rows) + "\n"
+
+
+async def lines(content: str) -> AsyncIterator[str]:
+    for line in io.StringIO(content):
+        yield line
+
+
+def expected(content: str) -> list[str]:
+    return [DiscussionLeader(row).email for row in csv.DictReader(io.StringIO(content))]
+
+
+async def main() -> None:
+    print(f"{'case':>18} {'rows':>6} {'DLs':>6} {'errors':>6} {'time (ms)':>10} {'rows/s':>10}")
+    for case in ("plain", "stray quotes", "multi-line fields"):
+        for n in SIZES:
+            content = roster(n, case)
+            start = time.perf_counter()
+            dls, errors = await parse_csv(lines(content))
+            elapsed = time.perf_counter() - start
+            assert [dl.email for dl in dls] == expected(content) and not errors, (case, n, errors[:3])
+            print(f"{case:>18} {n:>6} {len(dls):>6} {len(errors):>6} {elapsed * 1000:>10.1f} {n / elapsed:>10.0f}")
+
+    content = roster(200, "plain") + 'Zed,"Unclosed,zed@sfsu.edu,1,,,,\n'
+    dls, errors = await parse_csv(lines(content))
+    assert len(dls) == 200 and len(errors) == 1, (len(dls), errors)
+    print(f"unclosed quote on row 201: {len(dls)} DL(s) parsed, reported: {errors[0]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
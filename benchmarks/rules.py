@@ -0,0 +1,97 @@
+"""
+Cost of ``/rules update`` against the fake Discord API, with 1, 10 and 50 rules messages.
+
+    python -m benchmarks.rules [--latency 0.05] [--limit 5] [--window 1]
+
+The rules are posted to one channel each, then updated three ways: message by message with a fetch,
+an edit and a reaction each (what ``/rules update`` used to do), message by message with the template
+unchanged, and all at once with ``/rules update`` after the template changed. For each, the channel
+API calls and wall time are reported, and every message is checked to show the new template.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_discord import FakeDiscord
+from bot.extensions.rules import Rules
+from bot.rules import REACTION, TEMPLATE_PATH, RulesPosts, RulesTemplate
+
+SIZES = (1, 10, 50)
+
+
+def channel_calls(fake: FakeDiscord) -> int:
+    return sum(count for route, count in fake.requests.items() if "/channels/" in route)
+
+
+async def run(n: int, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    channels = [int(fake.add_channel(f"rules-{i}")["id"]) for i in range(n)]
+    bot = await fake.connect()
+    guild = bot.get_guild(fake.guild_id)
+    cog = Rules(bot)
+    cog.posts = RulesPosts(Path(f"rules-{n}.sqlite3"))
+    cog.template_path = Path(f"rules-{n}.json")
+    template = json.loads(TEMPLATE_PATH.read_text(encoding="utf-8"))
+    cog.template_path.write_text(json.dumps(template), encoding="utf-8")
+
+    try:
+        for channel_id in channels:
+            await cog.post.callback(cog, fake.interaction(bot), guild.get_channel(channel_id), None)
+        posts = [m for m in fake.messages.values() if int(m["channel_id"]) in channels]
+
+        async def measure(label: str, update) -> None:
+            calls, start = channel_calls(fake), time.perf_counter()
+            await update()
+            print(f"{n:>5} {label:>24} {channel_calls(fake) - calls:>9} {time.perf_counter() - start:>9.2f}")
+
+        async def naive():
+            current = RulesTemplate.load(cog.template_path)
+            for post in posts:
+                message = await guild.get_channel(int(post["channel_id"])).fetch_message(int(post["id"]))
+                await message.edit(content=current.content, embeds=current.embeds)
+                await message.add_reaction(REACTION)
+
+        async def unchanged():
+            for post in posts:
+                await cog.rules_update.callback(cog, fake.interaction(bot), None, post["id"], None)
+
+        async def changed():
+            template["content"] += " 🦆"
+            cog.template_path.write_text(json.dumps(template), encoding="utf-8")
+            await cog.rules_update.callback(cog, fake.interaction(bot), None, None, None)
+
+        await measure("fetch, edit and react", naive)
+        await measure("unchanged", unchanged)
+        await measure("template changed", changed)
+    finally:
+        await bot.http.close()
+        await fake.stop()
+
+    stale = sum(post["content"] != template["content"] for post in posts)
+    if stale:
+        print(f"{stale} message(s) do not show the new template")
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s")
+    print(f"{'posts':>5} {'update':>24} {'API calls':>9} {'wall (s)':>9}")
+    for n in SIZES:
+        await run(n, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=5, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    logging.basicConfig(level=logging.ERROR)
+    # The posts are recorded in ./data, so keep them out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
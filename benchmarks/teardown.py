@@ -0,0 +1,83 @@
+"""
+Benchmark ``/teardown`` on a synthetic guild, against the fake Discord API.
+
+    python -m benchmarks.teardown [--latency 0.05] [--limit 50] [--window 1]
+
+Every member has a course role and one in five also has a ``Team …`` DL role. The DL roles are
+deleted outright, and the course roles are removed from every member with 1 and with 5 calls in
+flight per rate-limit bucket. For each run the API calls, ``429`` responses, wall time and members
+per second are reported, next to the calls a member-by-member, role-by-role teardown would make.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.commands import RateLimitWaits
+from benchmarks.fake_discord import FakeDiscord
+from bot.constants import Bot as BotConfig
+from bot.extensions.teardown import Teardown
+
+SIZES = (1_000, 2_500)
+COURSES = ("CSC 215", "CSC 220", "CSC 340", "CSC 413")
+TEAMS = 16
+STUDENT_IDS = 1_000_000
+
+
+async def run(members: int, pattern: str, mode: str, per_bucket: int, args: argparse.Namespace) -> None:
+    fake = FakeDiscord(latency=args.latency, limit=args.limit, window=args.window)
+    await fake.start()
+    rng = random.Random(members)
+    courses = [int(fake.add_role(name)["id"]) for name in COURSES]
+    teams = [int(fake.add_role(f"Team DL{i}")["id"]) for i in range(TEAMS)]
+    for user_id in range(STUDENT_IDS, STUDENT_IDS + members):
+        fake.member_roles[user_id] = {rng.choice(courses)} | ({rng.choice(teams)} if rng.random() < 0.2 else set())
+    selected = set(courses if mode == "strip" else teams)
+    pairs = sum(len(roles & selected) for roles in fake.member_roles.values())
+
+    BotConfig.member_edit_concurrency = per_bucket
+    bot = await fake.connect()
+    cog = Teardown(bot)
+    with RateLimitWaits().installed():
+        start = time.perf_counter()
+        try:
+            await cog.teardown.callback(cog, fake.interaction(bot), pattern, None, mode, True)
+            await bot.jobs.join()
+        finally:
+            elapsed = time.perf_counter() - start
+            await bot.http.close()
+            await fake.stop()
+
+    left = sum(len(roles & selected) for roles in fake.member_roles.values())
+    calls = sum(count for route, count in fake.requests.items() if "/guilds/" in route)
+    print(
+        f"{members:>7} {mode:>6} {per_bucket:>10} {pairs:>12} {calls:>9} {fake.throttled:>6} {elapsed:>9.2f} "
+        f"{members / elapsed:>10.1f} {left:>5}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"latency {args.latency}s, {args.limit} request(s) per bucket per {args.window}s")
+    print(
+        f"{'members':>7} {'mode':>6} {'per bucket':>10} {'naive calls':>12} {'API calls':>9} {'429s':>6} "
+        f"{'wall (s)':>9} {'members/s':>10} {'left':>5}"
+    )
+    for members in SIZES:
+        await run(members, "Team *", "delete", 1, args)
+        for per_bucket in (1, 5):
+            await run(members, "CSC *", "strip", per_bucket, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--limit", type=int, default=50, help="requests per rate-limit bucket per window")
+    parser.add_argument("--window", type=float, default=1.0, help="rate-limit window in seconds")
+    logging.basicConfig(level=logging.ERROR)
+    # The reaction-role index is written to ./data, so keep it out of the working tree.
+    os.chdir(tempfile.mkdtemp(prefix="qwacker-bench-"))
+    asyncio.run(main(parser.parse_args()))
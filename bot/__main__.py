@@ -1,35 +1,102 @@
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import time
+from pathlib import Path
 
 import discord
-from discord.ext.commands import Bot
+from discord.ext.commands import AutoShardedBot, Bot
 
 from bot.constants import Bot as BotConfig
-from bot.constants import Guild
+from bot.guild_config import GuildConfigs
+from bot.guild_state import GuildStates
+from bot.jobs import JobRunner
+from bot.metrics import metrics
+from bot.profiles import client_options
+from bot.reaction_roles import RoleIndex
 
 
 discord.utils.setup_logging()
 log = logging.getLogger()
 
-intents = discord.Intents.default()
-intents.message_content = True
 
-GUILD = discord.Object(id=Guild.id)
+def process_age() -> float:
+    """
+    Seconds since the process started, so the cold start includes the imports above.
 
+    Read from ``/proc`` on Linux; elsewhere the imports are not counted.
+    """
+    try:
+        stat = Path("/proc/self/stat").read_text()
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+    except OSError:
+        return 0.0
+    # The process name (field 2) may contain spaces, so count fields from its closing parenthesis.
+    started = int(stat.rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+    return max(0.0, uptime - started)
 
-class Qwacker(Bot):
+
+STARTED_AT = time.perf_counter() - process_age()
+
+
+class Qwacker(AutoShardedBot if BotConfig.sharded else Bot):
     def __init__(self, **kwargs):
         super().__init__(
-            command_prefix=BotConfig.prefix, case_insensitive=True, intents=intents
+            command_prefix=BotConfig.prefix,
+            case_insensitive=True,
+            http_trace=metrics.trace_config(),
+            shard_count=BotConfig.shard_count,
+            **client_options(BotConfig.profile),
         )
+        self.cold_start: float | None = None
+        self.jobs = JobRunner()
+        self.reaction_roles = RoleIndex()
+        self.guild_state = GuildStates()
+        self.guild_config = GuildConfigs()
 
     async def setup_hook(self) -> None:
         await self.load_extension("bot.extensions.archive_channels")
         await self.load_extension("bot.extensions.rules")
         await self.load_extension("bot.extensions.dl_setup")
-
-        self.tree.copy_global_to(guild=GUILD)
-        await self.tree.sync(guild=GUILD)
+        await self.load_extension("bot.extensions.metrics")
+        await self.load_extension("bot.extensions.jobs")
+        await self.load_extension("bot.extensions.reaction_roles")
+        await self.load_extension("bot.extensions.teardown")
+        await self.load_extension("bot.extensions.guild_state")
+
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        await self.sync_commands(guild)
+
+    async def sync_all_commands(self) -> None:
+        """
+        Sync the command tree to every guild the bot is in. Guild commands show up right away, unlike global ones.
+
+        The guilds are only known once the gateway sent them, so this runs on ready rather than in ``setup_hook``.
+        Guilds whose tree is unchanged cost nothing, so this also catches guilds joined while the bot was offline.
+        """
+        await asyncio.gather(*(self.sync_commands(guild) for guild in self.guilds))
+
+    async def sync_commands(self, guild: discord.abc.Snowflake) -> None:
+        """
+        Sync the command tree to the guild, but only if it changed since the last sync.
+
+        The hash of the serialized tree is kept on disk, so restarting the bot does not spend a sync
+        (which is heavily rate limited) on an identical tree.
+        """
+        self.tree.copy_global_to(guild=guild)
+        payload = [command.to_dict() for command in self.tree.get_commands(guild=guild)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        path = BotConfig.data_dir / f"command_tree_{guild.id}.sha256"
+        if path.exists() and path.read_text() == digest:
+            log.info(f"Command tree of guild {guild.id} unchanged since last sync, skipping sync.")
+            return
+
+        await self.tree.sync(guild=guild)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(digest)
+        log.info(f"Synced {len(payload)} command(s) to guild {guild.id}.")
 
 
 bot: Bot = Qwacker()
@@ -37,9 +104,15 @@ bot: Bot = Qwacker()
 
 @bot.event
 async def on_ready():
-    guild = await bot.fetch_guild(Guild.id)
-    log.info(f"Ready. Logged in as {bot.user} (ID: {bot.user.id}).")
-    log.info(f"Current guild: {guild.name} (ID: {guild.id}).")
+    if bot.cold_start is None:
+        bot.cold_start = time.perf_counter() - STARTED_AT
+        log.info(f"Cold start took {bot.cold_start:.2f}s.")
+    log.info(f"Ready. Logged in as {bot.user} (ID: {bot.user.id}), shard(s): {bot.shard_count or 1}.")
+    # The guilds arrived with the gateway's READY, so this needs no REST call.
+    for guild in bot.guilds:
+        state = bot.guild_state[guild]
+        log.info(f"Guild: {guild.name} (ID: {guild.id}), {len(state.channels)} channels, {len(state.roles)} roles.")
+    await bot.sync_all_commands()
 
 
 bot.run(BotConfig.token)
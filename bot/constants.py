@@ -1,3 +1,6 @@
+from pathlib import Path
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -13,9 +16,32 @@ class _Bot(EnvConfig, env_prefix="bot_"):
     token: str = ""
     debug: bool = False
     prefix: str = "/"
+    # max in-flight REST calls for bulk jobs; calls on the same rate-limit bucket are serialised by default
+    rest_concurrency: int = 16
+    # in-flight calls on one rate-limit bucket when a job edits members one by one, e.g. /teardown
+    member_edit_concurrency: int = 5
+    # max background jobs (/archive, /dl setup, ...) running at once per guild, the rest wait in a queue
+    job_concurrency: int = 2
+    # seconds between edits of a job's status message, progress in between is coalesced
+    job_progress_interval: float = 2.0
+    # seconds a member's reaction role changes are held, so quick toggles cancel out instead of costing API calls
+    reaction_role_delay: float = 1.0
+    # local state that must survive restarts, e.g. emojis Discord rejected
+    data_dir: Path = Path("data")
+    # per-guild settings, one <guild id>.toml per guild, read the first time a guild needs them
+    guild_config_dir: Path = Path("config/guilds")
+    # run as an AutoShardedBot, with shard_count shards or as many as Discord recommends if unset
+    sharded: bool = False
+    shard_count: int | None = None
+    # "lean" only subscribes to and caches what the cogs use, "default" is discord.py's defaults
+    profile: Literal["lean", "default"] = "lean"
+    # Prometheus endpoint, set the port to 0 to disable
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9108
 
 
 class _Guild(EnvConfig, env_prefix="guild_"):
+    # primary guild, whose channels and categories below need no config file (see bot/guild_config.py)
     id: int = 803123133015261285
 
 
@@ -0,0 +1,198 @@
+"""
+Offline index of the Unicode emojis that Discord accepts as reactions.
+
+Discord lags behind the Unicode release cycle, so an emoji that renders fine may still be
+rejected by ``add_reaction`` with error 10014. The bundled index lists every fully-qualified
+emoji up to ``MAX_EMOJI_VERSION``; emojis rejected at runtime anyway are remembered on disk
+and never tried again.
+
+A second bundled file holds the small part of the ``emoji`` package the bot uses to parse DL
+preferences: every emoji sequence, and the ``:alias:`` names that resolve to each one. It is loaded
+the first time a roster is parsed, instead of importing the whole ``emoji`` database (and keeping
+it in memory) on every boot.
+
+Run ``python -m bot.emojis`` to regenerate both files from the installed ``emoji`` package.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from functools import cache
+from pathlib import Path
+
+from bot.constants import Bot as BotConfig
+
+log = logging.getLogger()
+
+INDEX_PATH = Path(__file__).parent / "data" / "discord_emojis.txt"
+LOOKUP_PATH = Path(__file__).parent / "data" / "emoji_lookup.txt"
+ZWJ = "\u200d"
+REJECTED_PATH = BotConfig.data_dir / "rejected_emojis.json"
+
+INDEX_VERSION = 1
+# Newest Unicode Emoji version fully supported by Discord's emoji set.
+MAX_EMOJI_VERSION = 15.0
+
+
+def normalize(e: str) -> str:
+    """Strip variation selectors so "⚾️" and "⚾" are treated as the same emoji."""
+    return e.replace("\ufe0f", "")
+
+
+@cache
+def supported_emojis() -> frozenset[str]:
+    """Returns the normalized emojis in the bundled index."""
+    with INDEX_PATH.open(encoding="utf-8") as f:
+        return frozenset(normalize(line.rstrip("\n")) for line in f if line.strip() and not line.startswith("# "))
+
+
+@cache
+def rejected_emojis() -> set[str]:
+    """Returns the normalized emojis that Discord rejected at runtime."""
+    try:
+        return set(json.loads(REJECTED_PATH.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        return set()
+
+
+def is_supported(e: str) -> bool:
+    """Whether ``e`` can be used as a reaction, without making any API call."""
+    n = normalize(e)
+    return n in supported_emojis() and n not in rejected_emojis()
+
+
+def mark_unsupported(e: str) -> None:
+    """Remember that Discord rejected ``e`` so it is never tried again."""
+    rejected = rejected_emojis()
+    rejected.add(normalize(e))
+    REJECTED_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REJECTED_PATH.write_text(json.dumps(sorted(rejected), ensure_ascii=False), encoding="utf-8")
+    log.warning(f"Emoji {e} was rejected by Discord and will not be used again")
+
+
+# The characters ``emoji.emojize`` accepts in a name, so the same ``:aliases:`` are recognised.
+ALIAS_PATTERN = re.compile(
+    r":([\w\-&.’”“()!#*+,/«»\u0300\u0301\u0302\u0303\u0306\u0308\u030a\u0327"
+    r"\u064b\u064e\u064f\u0650\u0653\u0654\u0655\u3099\u309a\u30fb]+):"
+)
+
+
+@cache
+def _lookup() -> tuple[dict[str, str], frozenset[str], frozenset[str], frozenset[str]]:
+    """
+    Returns the emoji each alias resolves to, every known emoji sequence, every prefix of one
+    (standing in for the search tree of the ``emoji`` package), and the sequences that are components
+    such as skin tones.
+    """
+    aliases, sequences, prefixes, components = {}, set(), set(), set()
+    with LOOKUP_PATH.open(encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("# "):
+                continue
+            e, kind, names = line.rstrip("\n").split("\t")
+            sequences.add(e)
+            prefixes.update(e[:i] for i in range(1, len(e) + 1))
+            if kind == "component":
+                components.add(e)
+            aliases.update(dict.fromkeys(names.split(), e))
+    return aliases, frozenset(sequences), frozenset(prefixes), frozenset(components)
+
+
+def emojize(text: str) -> str:
+    """Replace ``:aliases:`` with their emoji, like ``emoji.emojize(text, language="alias")``."""
+    aliases = _lookup()[0]
+
+    def replace(match: re.Match) -> str:
+        return aliases.get(unicodedata.normalize("NFKC", match.group(1)), match.group(0))
+
+    return ALIAS_PATTERN.sub(replace, text)
+
+
+def emoji_list(text: str) -> list[str]:
+    """
+    Returns the emojis in ``text``, in order, like ``emoji.emoji_list``.
+
+    This follows ``emoji.tokenizer.tokenize(text, keep_zwj=False)``, quirks included, so rosters parse
+    exactly as before: a ZWJ sequence Unicode does not define is split into the emojis it joins.
+    """
+    _, sequences, prefixes, components = _lookup()
+    # (characters, whether they matched as an emoji) since the last flush.
+    found: list[str] = []
+    pending: list[tuple[str, bool]] = []
+    ignore: set[int] = set()  # ZWJs of sequences being split
+    i = 0
+    while i < len(text):
+        char = text[i]
+        consumed = False
+        if i in ignore:
+            i += 1
+            continue
+        elif char in prefixes:
+            j = i + 1
+            while j < len(text) and j not in ignore and text[i : j + 1] in prefixes:
+                j += 1
+            if text[i:j] in sequences:
+                pending.append((text[i:j], True))
+                i = j - 1
+                consumed = True
+        elif char == ZWJ and pending and pending[-1][0] in sequences and i > 0 and text[i - 1] in prefixes:
+            # A ZWJ after an emoji that did not match as a whole: rescan the emoji, stopping at the ZWJ.
+            ignore.add(i)
+            if pending[-1][0] in components:
+                i -= sum(len(chars) for chars, _ in pending[-2:])
+                if text[i] == ZWJ:
+                    i += 1
+                    del pending[-1]
+                else:
+                    del pending[-2:]
+            else:
+                i -= len(pending[-1][0])
+                del pending[-1]
+            continue
+        elif pending:
+            found += [chars for chars, matched in pending if matched]
+            pending = []
+        if not consumed and char not in "\ufe0e\ufe0f":
+            pending.append((char, False))
+        i += 1
+    return found + [chars for chars, matched in pending if matched]
+
+
+def generate_index() -> None:
+    import emoji
+
+    emojis = sorted(
+        e
+        for e, data in emoji.EMOJI_DATA.items()
+        if data["status"] == emoji.STATUS["fully_qualified"] and data["E"] <= MAX_EMOJI_VERSION
+    )
+    with INDEX_PATH.open("w", encoding="utf-8") as f:
+        f.write(f"# index-version: {INDEX_VERSION}\n")
+        f.write(f"# emoji-version: {MAX_EMOJI_VERSION}\n")
+        f.write(f"# generated-from: emoji {emoji.__version__}\n")
+        f.writelines(f"{e}\n" for e in emojis)
+    print(f"Wrote {len(emojis)} emojis to {INDEX_PATH}")
+
+    # Resolve aliases the way emojize(language="alias") does: "alias" names first, then English names.
+    fully_qualified = emoji.STATUS["fully_qualified"]
+    names: dict[str, list[str]] = {e: [] for e in emoji.EMOJI_DATA}
+    resolved = set()
+    for language in ("alias", "en"):
+        for e, data in emoji.EMOJI_DATA.items():
+            if data["status"] > fully_qualified:
+                continue
+            for name in data.get(language, []) if language == "alias" else [data["en"]]:
+                if name not in resolved:
+                    resolved.add(name)
+                    names[e].append(name.strip(":"))
+    with LOOKUP_PATH.open("w", encoding="utf-8") as f:
+        f.write(f"# generated-from: emoji {emoji.__version__}\n")
+        for e, n in names.items():
+            kind = "component" if emoji.EMOJI_DATA[e]["status"] == emoji.STATUS["component"] else ""
+            f.write(f"{e}\t{kind}\t{' '.join(n)}\n")
+    print(f"Wrote {len(names)} emojis and {len(resolved)} aliases to {LOOKUP_PATH}")
+
+
+if __name__ == "__main__":
+    generate_index()
@@ -0,0 +1,112 @@
+"""
+Export channel history to gzip-compressed JSONL, one message per line.
+
+Channels are paged through with ``channel.history``, oldest first, and every page of messages is
+appended to the channel's file as its own gzip member (a file of concatenated members is still a
+valid ``.gz``), so memory use does not grow with the size of the channel. After each page, the last
+exported message and the file's length are journaled; an interrupted export truncates anything
+written after that point and continues from the next message.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+import discord
+
+from bot.constants import Bot as BotConfig
+from bot.journal import Journal
+
+log = logging.getLogger()
+
+EXPORT_DIR = BotConfig.data_dir / "exports"
+PAGE_SIZE = 100  # Messages per history request, Discord's maximum.
+
+
+def message_record(message: discord.Message) -> dict:
+    """The parts of a message worth keeping once a channel is archived."""
+    return {
+        "id": message.id,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at and message.edited_at.isoformat(),
+        "author": {"id": message.author.id, "name": message.author.name, "bot": message.author.bot},
+        "content": message.content,
+        "reply_to": message.reference and message.reference.message_id,
+        "pinned": message.pinned,
+        "attachments": [
+            {"filename": a.filename, "size": a.size, "content_type": a.content_type, "url": a.url}
+            for a in message.attachments
+        ],
+        "reactions": [{"emoji": str(r.emoji), "count": r.count} for r in message.reactions],
+    }
+
+
+def export_path(channel: discord.abc.GuildChannel, directory: Path = EXPORT_DIR) -> Path:
+    return directory / str(channel.guild.id) / f"{channel.name}-{channel.id}.jsonl.gz"
+
+
+async def export_channel(channel: discord.TextChannel, path: Path, journal: Journal = None) -> int:
+    """Append the channel's history to ``path``, resuming from the journal. Returns the number of messages."""
+    done = f"exported:{channel.id}"
+    if journal and done in journal:
+        return int(journal.get(done))
+
+    cursor = f"cursor:{channel.id}"
+    after, offset, count = None, 0, 0
+    if journal and (saved := journal.get(cursor)) and path.exists():
+        last_id, offset, count = map(int, saved.split(":"))
+        after = discord.Object(last_id)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "r+b" if offset else "wb") as f:
+        # Drop whatever was written after the last journaled page.
+        f.truncate(offset)
+        f.seek(offset)
+        page = []
+
+        def write():
+            nonlocal count
+            f.write(gzip.compress("".join(page).encode("utf-8")))
+            f.flush()
+            count += len(page)
+            page.clear()
+            if journal:
+                journal.record(cursor, f"{last.id}:{f.tell()}:{count}")
+
+        async for last in channel.history(limit=None, after=after, oldest_first=True):
+            page.append(json.dumps(message_record(last), ensure_ascii=False) + "\n")
+            if len(page) == PAGE_SIZE:
+                write()
+        if page:
+            write()
+
+    if journal:
+        journal.record(done, count)
+    return count
+
+
+async def export_channels(
+    channels: list[discord.TextChannel],
+    journal: Journal = None,
+    directory: Path = EXPORT_DIR,
+    on_exported: Callable[[discord.TextChannel, int], None] = None,
+    concurrency: int = BotConfig.rest_concurrency,
+) -> dict[discord.TextChannel, int]:
+    """
+    Export several channels concurrently. Each channel has its own rate-limit bucket, so they do not
+    slow each other down. Returns the number of messages exported per channel.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def export(channel: discord.TextChannel) -> int:
+        async with slots:
+            count = await export_channel(channel, export_path(channel, directory), journal)
+        if on_exported:
+            on_exported(channel, count)
+        return count
+
+    counts = await asyncio.gather(*(export(channel) for channel in channels))
+    return dict(zip(channels, counts))
@@ -1,12 +1,114 @@
 import logging
+import re
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from bot.export import EXPORT_DIR, export_channels
+from bot.guild_state import GuildState, channel_name
+from bot.jobs import Job
+from bot.journal import Journal
+from bot.rest import RestScheduler, bucket, bulk_reorder
+
 log = logging.getLogger()
 
 
+async def archive_channels(
+    scheduler: RestScheduler,
+    channels: list[discord.TextChannel],
+    destination: discord.CategoryChannel,
+    suffix: str = None,
+    journal: Journal = None,
+) -> list[discord.TextChannel]:
+    """
+    Move ``channels`` to the end of ``destination``, appending ``suffix`` to their names.
+
+    Each channel is renamed, re-parented and synced to the destination's permissions with a single
+    edit, and the edits run concurrently since every channel has its own rate-limit bucket.
+    The final order is then set with one bulk position update instead of one move per channel.
+
+    With a ``journal``, channels moved by an interrupted run are not edited again but are still
+    included in the final ordering. Returns every archived channel.
+    """
+    reason = "Archiving channel"
+    guild = destination.guild
+    resumed = [guild.get_channel(int(i)) for i in journal.entries("moved:").values()] if journal else []
+    resumed = [c for c in resumed if c is not None]
+    channels = [c for c in channels if c not in resumed]
+    start = int(journal.get("start")) if journal and "start" in journal else None
+    if start is None:
+        start = max((c.position for c in destination.text_channels), default=-1) + 1
+        if journal:
+            journal.record("start", start)
+
+    def edit(channel: discord.TextChannel):
+        options = dict(category=destination, sync_permissions=True, reason=reason)
+        if suffix:
+            options["name"] = channel.name + suffix
+
+        async def run():
+            await channel.edit(**options)
+            if journal:
+                journal.record(f"moved:{channel.id}", channel.id)
+
+        return run
+
+    await scheduler.gather((bucket("PATCH /channels", c.id), edit(c)) for c in channels)
+    channels = sorted(resumed, key=lambda c: c.position) + channels
+    await bulk_reorder(scheduler, guild, channels, start, reason=reason)
+    return channels
+
+
+def check_archive(
+    state: GuildState, channels: list[discord.TextChannel], destination: discord.CategoryChannel, suffix: str = None
+) -> list[str]:
+    """
+    Check the archive plan against the guild state index before any API call is made.
+
+    Raises ``ValueError`` if a new channel name would be longer than Discord allows. Returns a warning
+    for every channel that would end up with the same name as another channel in ``destination``.
+    """
+    if too_long := [c.mention for c in channels if len(c.name + (suffix or "")) > 100]:
+        raise ValueError(f"Channel names can be at most 100 characters, {', '.join(too_long)} would be longer.")
+
+    warnings = []
+    names = {}
+    for channel in channels:
+        name = channel_name(channel.name + (suffix or ""))
+        if (other := names.setdefault(name, channel)) is not channel:
+            warnings.append(f"{channel.mention} and {other.mention} will both be called #{name}.")
+        elif clashes := [c for c in state.channels_named(name, destination.id) if c.id != channel.id]:
+            warnings.append(
+                f"{channel.mention} will be called #{name}, like <#{clashes[0].id}> in {destination.mention}."
+            )
+    return warnings
+
+
+def resolve_categories(guild: discord.Guild, raw: str, names: dict[str, int]) -> list[discord.CategoryChannel]:
+    """
+    Resolve a comma- or space-separated list of categories.
+
+    Each entry may be a category name from the guild's config (``names``, e.g. "csc215"), a category ID,
+    or a channel mention.
+    """
+    categories = []
+    for token in filter(None, re.split(r"[\s,]+", raw)):
+        if token.lower() in names:
+            category_id = names[token.lower()]
+        elif match := re.fullmatch(r"<#(\d+)>|(\d+)", token):
+            category_id = int(match.group(1) or match.group(2))
+        else:
+            raise ValueError(f"Unknown category: {token}")
+
+        category = guild.get_channel(category_id)
+        if not isinstance(category, discord.CategoryChannel):
+            raise ValueError(f"{token} is not a category in this server")
+        if category not in categories:
+            categories.append(category)
+    return categories
+
+
 class ArchiveCategory(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -16,6 +118,7 @@ class ArchiveCategory(commands.Cog):
         to_archive="Text channel or category to archive",
         destination="Category to move the channels into",
         suffix="Suffix to add to the channel name e.g., “-fa23”",
+        export="Export the message history of the channels before archiving them",
     )
     async def archive(
         self,
@@ -23,20 +126,117 @@ class ArchiveCategory(commands.Cog):
         to_archive: discord.TextChannel | discord.CategoryChannel,
         destination: discord.CategoryChannel,
         suffix: str = None,
+        export: bool = False,
     ):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("You do not have permission to invoke this command.")
             return
 
         channels = to_archive.text_channels if isinstance(to_archive, discord.CategoryChannel) else [to_archive]
+        try:
+            warnings = check_archive(self.bot.guild_state[interaction.guild], channels, destination, suffix)
+        except ValueError as e:
+            await interaction.response.send_message(str(e))
+            return
+
+        async def work(job: Job) -> str:
+            nonlocal channels
+            for warning in warnings:
+                job.note(warning)
+            scheduler = RestScheduler()
+            journal = Journal(f"archive:{to_archive.id}:{destination.id}:{suffix}")
+            exported = await self.export_stage(job, channels, journal) if export else ""
+            job.update(f"Archiving {len(channels)} channel(s) into {destination.mention}...")
+            channels = await archive_channels(scheduler, channels, destination, suffix, journal)
+            journal.finish()
+
+            log.info(f"Archived {len(channels)} channel(s) into {destination}: {scheduler.summary()}")
+            return f"Finished archiving {len(channels)} channel(s) ({scheduler.summary()}).{exported}"
+
+        await self.bot.jobs.submit("archive", interaction, work)
+
+    @app_commands.command(name="rollover", description="Archive several categories at once at the end of a semester")
+    @app_commands.describe(
+        sources="Categories to archive, e.g. “csc215 csc220 tutors” or category IDs",
+        destination="Category to move the channels into",
+        suffix="Suffix to add to the channel names e.g., “-fa23”",
+        export="Export the message history of the channels before archiving them",
+    )
+    async def rollover(
+        self,
+        interaction: discord.Interaction,
+        sources: str,
+        destination: discord.CategoryChannel,
+        suffix: str,
+        export: bool = False,
+    ):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+
+        try:
+            categories = resolve_categories(
+                interaction.guild, sources, self.bot.guild_config.get(interaction.guild_id).categories
+            )
+        except ValueError as e:
+            await interaction.response.send_message(str(e))
+            return
+
+        # One combined plan: every channel is edited concurrently and the whole destination is
+        # reordered with a single bulk update, rather than once per category.
+        channels = [channel for category in categories for channel in category.text_channels]
+        try:
+            warnings = check_archive(self.bot.guild_state[interaction.guild], channels, destination, suffix)
+        except ValueError as e:
+            await interaction.response.send_message(str(e))
+            return
+
+        async def work(job: Job) -> str:
+            nonlocal channels
+            for warning in warnings:
+                job.note(warning)
+            scheduler = RestScheduler()
+            journal = Journal(f"rollover:{','.join(str(c.id) for c in categories)}:{destination.id}:{suffix}")
+            exported = await self.export_stage(job, channels, journal) if export else ""
+            job.update(f"Archiving {len(channels)} channel(s) into {destination.mention}...")
+            channels = await archive_channels(scheduler, channels, destination, suffix, journal)
+            journal.finish()
+
+            log.info(f"Rolled over {len(categories)} categories into {destination}: {scheduler.summary()}")
+            return (
+                f"Archived {len(channels)} channel(s) from {', '.join(c.mention for c in categories)} "
+                f"({scheduler.summary()}).{exported}"
+            )
+
+        await self.bot.jobs.submit("rollover", interaction, work)
+
+    @staticmethod
+    async def export_stage(job: Job, channels: list[discord.TextChannel], journal: Journal) -> str:
+        """Export the history of ``channels``, reporting progress on the job. Returns a summary."""
+        job.update("Exporting message history:", total=len(channels))
+        counts = await export_channels(
+            channels, journal, on_exported=lambda c, n: job.step(f"Exported {n} message(s) from {c.mention}.")
+        )
+        log.info(f"Exported {sum(counts.values())} message(s) from {len(counts)} channel(s)")
+        return f" Exported {sum(counts.values())} message(s) to `{EXPORT_DIR}`."
+
+    @app_commands.command(name="export", description="Export the message history of channels")
+    @app_commands.describe(to_export="Text channel or category to export")
+    async def export(self, interaction: discord.Interaction, to_export: discord.TextChannel | discord.CategoryChannel):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+
+        channels = to_export.text_channels if isinstance(to_export, discord.CategoryChannel) else [to_export]
 
-        await interaction.response.defer(thinking=True)
-        for channel in channels:
-            if suffix:
-                await channel.edit(name=channel.name + suffix, reason="Archiving channel")
-            await channel.move(end=True, category=destination, sync_permissions=True, reason="Archiving channel")
+        async def work(job: Job) -> str:
+            # Re-running the same export resumes from the last journaled page of each channel.
+            journal = Journal(f"export:{to_export.id}")
+            exported = await self.export_stage(job, channels, journal)
+            journal.finish()
+            return f"Finished exporting {len(channels)} channel(s).{exported}"
 
-        await interaction.followup.send(f"Finished archiving {len(channels)} channel(s).")
+        await self.bot.jobs.submit("export", interaction, work)
 
 
 async def setup(bot: commands.Bot):
@@ -1,19 +1,34 @@
+import asyncio
 import csv
+import hashlib
+import io
+import itertools
+import json
 import logging
 import random
-import traceback
+import re
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 
+import aiohttp
 import discord
-import emoji
 from discord import app_commands, Embed
 from discord.ext import commands
 
+from bot.emojis import emoji_list, emojize, is_supported, mark_unsupported, normalize
+from bot.guild_state import GuildState, channel_name
+from bot.jobs import Job
+from bot.journal import Journal
+from bot.rest import RestScheduler, bucket, bulk_reorder
+
 log = logging.getLogger()
 
 # fmt: off
 DL_TABS_URL = "https://dl.ducta.net"
+ASK_TOPIC_PATTERN = re.compile(r"<@&(\d+)>.*please email (\S+)\. For session", re.DOTALL)
+EMBED_FIELD_PATTERN = re.compile(r"^(\S+) <@&(\d+)>")
 # Hopefully non-offensive food emojis...
 FALLBACK_EMOJIS = [
     "🍇", "🍈", "🍉", "🍊", "🍋", "🍋‍🟩", "🍌", "🍍", "🥭", "🍎", "🍏",
@@ -30,6 +45,12 @@ FALLBACK_EMOJIS = [
 # fmt: on
 
 
+@lru_cache(maxsize=1024)
+def parse_emojis(raw: str) -> tuple[str, ...]:
+    """Parse a string of emojis and :aliases:. Cached, since many rows share the same preferences."""
+    return tuple(emoji_list(emojize(raw)))
+
+
 @dataclass
 class DiscussionLeader:
     first: str
@@ -64,7 +85,7 @@ class DiscussionLeader:
             self.preferred = preferred if preferred.lower() != self.first.lower() else None
 
         # try to escape some :emojis:
-        self.emojis = list(e["emoji"] for e in emoji.emoji_list(emoji.emojize(d.get("Emojis", ""), language="alias")))
+        self.emojis = list(parse_emojis(d.get("Emojis") or ""))
 
         if raw_ts := d.get("Timestamp"):
             try:
@@ -105,21 +126,71 @@ class DiscussionLeader:
         return f"Team {self.display_name}"
 
 
-def parse_csv(raw_csv: str) -> list[DiscussionLeader]:
-    reader = csv.DictReader(raw_csv.splitlines())
-    dls = []
+async def stream_lines(attachment: discord.Attachment) -> AsyncIterator[str]:
+    """Yield the lines of an attachment as they are downloaded, without holding the whole file."""
+    async with aiohttp.ClientSession() as session, session.get(attachment.url) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            # Newlines never occur inside a multibyte UTF-8 sequence, so each line decodes on its own.
+            yield line.decode("utf-8")
+
 
-    if missing := {"First", "Last", "Email", "Sections", "Username"} - set(reader.fieldnames):
-        raise ValueError(f"Missing required fields: {', '.join(missing)}. Got: {reader.fieldnames}")
+async def iter_rows(lines: AsyncIterable[str]) -> AsyncIterator[list[str]]:
+    """
+    Parse CSV rows as their lines arrive, with the same rules as ``csv.reader``.
 
-    for i, row in enumerate(reader, start=1):
+    A quoted field can span lines, so lines are held until ``csv`` finishes the row. A quote inside an
+    unquoted field (``O"Neil``) is an ordinary character and does not hold any lines back.
+    Raises ``ValueError`` if the file ends inside a quoted field.
+    """
+    pending: list[str] = []
+    async for line in lines:
+        pending.append(line)
+        reader = csv.reader(itertools.chain(pending, ["\n"]))
         try:
-            dl = DiscussionLeader(row)
-            dls.append(dl)
-        except Exception as e:
-            raise ValueError(f"Parsing failed at row {i}: {row}") from e
+            values = next(reader)
+        except csv.Error as e:
+            raise ValueError(f"Line {reader.line_num}: {e}")
+        # The extra line is only read if the row is still inside a quoted field.
+        if reader.line_num > len(pending):
+            continue
+        yield values
+        pending = []
+    if pending:
+        raise ValueError(f"A quoted field is never closed, {len(pending)} line(s) from the end of the file.")
+
+
+async def parse_csv(lines: AsyncIterable[str]) -> tuple[list[DiscussionLeader], list[str]]:
+    """
+    Parse the DL roster in a single pass, one row at a time.
 
-    return dls
+    Returns the parsed DLs along with an error for every bad row, rather than stopping at the first one.
+    Raises ``ValueError`` if the header is missing required fields.
+    """
+    rows = iter_rows(lines)
+    fieldnames = await anext(rows, [])
+    if fieldnames:
+        fieldnames[0] = fieldnames[0].lstrip("\ufeff")
+    if missing := {"First", "Last", "Email", "Sections", "Username"} - set(fieldnames):
+        raise ValueError(f"Missing required fields: {', '.join(sorted(missing))}. Got: {fieldnames}")
+
+    dls, errors = [], []
+    i = 0
+    try:
+        async for values in rows:
+            if not values:
+                continue
+            i += 1
+            # As csv.DictReader: missing trailing fields are None.
+            row = dict(zip(fieldnames, values)) | {name: None for name in fieldnames[len(values) :]}
+            try:
+                dls.append(DiscussionLeader(row))
+            except Exception as e:
+                errors.append(f"Row {i}: {e}")
+    except ValueError as e:
+        errors.append(f"Row {i + 1}: {e}")
+
+    return dls, errors
 
 
 def create_role_embed(dls: list[DiscussionLeader]) -> Embed:
@@ -141,38 +212,366 @@ def create_role_embed(dls: list[DiscussionLeader]) -> Embed:
     return embed
 
 
-def assign_role_emoji(dls: list[DiscussionLeader]) -> list[DiscussionLeader]:
-    """Assign role emojis based on their provided preference."""
-    chosen_emojis = []
-    for dl in sorted(dls, key=lambda d: d.timestamp or datetime.today()):
-        for e in dl.emojis:
-            if e not in chosen_emojis:
-                dl.role_emoji = e
-                chosen_emojis.append(e)
-                break
-        # Possible infinite loop if there are more than 100 DLs and all of them pick a food emoji...
-        while dl.role_emoji is None:
-            dl.role_emoji = random.choice(FALLBACK_EMOJIS)
+def drop_unsupported_emojis(dls: list[DiscussionLeader]) -> list[str]:
+    """Remove emoji preferences that Discord does not accept. Returns a description of what was dropped."""
+    dropped = []
+    for dl in dls:
+        if unsupported := [e for e in dl.emojis if not is_supported(e)]:
+            dl.emojis = [e for e in dl.emojis if is_supported(e)]
+            dropped.append(f"{dl.full_name}: {' '.join(unsupported)}")
+    return dropped
+
+
+def assign_role_emoji(dls: list[DiscussionLeader], seed: int = 0) -> list[DiscussionLeader]:
+    """
+    Assign role emojis based on their provided preference.
+
+    DLs who responded earlier (by ``timestamp``) get first pick; each DL receives their highest-ranked
+    emoji that has not been taken yet and that Discord has not rejected. DLs with no available preference
+    get a fallback emoji drawn without replacement from a shuffled pool, so no two DLs share one. The
+    result only depends on the roster, ``seed`` and the rejected emojis. Raises ``ValueError`` if the
+    fallback pool runs out.
+    """
+    chosen: set[str] = set()
+    needs_fallback = []
+    for dl in sorted(dls, key=lambda d: d.timestamp or datetime.max):
+        dl.role_emoji = next((e for e in dl.emojis if e not in chosen and is_supported(e)), None)
+        if dl.role_emoji is None:
+            needs_fallback.append(dl)
+        else:
+            chosen.add(dl.role_emoji)
+
+    # Fallbacks are drawn after all preferences, so a DL never loses a preference to someone's random pick.
+    pool = [e for e in FALLBACK_EMOJIS if e not in chosen and is_supported(e)]
+    random.Random(seed).shuffle(pool)
+    if len(needs_fallback) > len(pool):
+        raise ValueError(
+            f"Not enough fallback emojis: {len(needs_fallback)} DL(s) need one but only {len(pool)} are left. "
+            "Ask DLs to provide more emoji preferences."
+        )
+    for dl in needs_fallback:
+        dl.role_emoji = pool.pop()
 
     return dls
 
 
-async def create_ask_channel(dl: DiscussionLeader, category: discord.CategoryChannel) -> discord.TextChannel:
+def ask_channel_topic(dl: DiscussionLeader) -> str:
+    """Returns the topic of the DL's ask-channel. The DL's role must already exist."""
+    return (
+        f"<@&{dl.role.id}> **{dl.sections_string}** \n\n"
+        f"For sensitive issues, please email {dl.email}. "
+        f"For session times and agenda, visit {DL_TABS_URL}."
+    )
+
+
+async def create_ask_channel(
+    dl: DiscussionLeader, category: discord.CategoryChannel, scheduler: RestScheduler
+) -> discord.TextChannel:
     """
     Create the "❓ask-name" channel for a given DL.
 
     The created channel contains the DL's section(s) and email. The permission is set
     such that users with the DL's role can access the channel. For access to work properly,
     the parent category must not have other overrides for other publicly-assignable roles.
+
+    The topic and overwrites are part of the creation payload, so this is a single request.
     """
-    channel = await category.create_text_channel(name=dl.ask_channel_name)
-    await channel.edit(
-        topic=f"<@&{dl.role.id}> **{dl.sections_string}** \n\n"
-        f"For sensitive issues, please email {dl.email}. "
-        f"For session times and agenda, visit {DL_TABS_URL}."
+    overwrites = {**category.overwrites, dl.role: discord.PermissionOverwrite(read_messages=True)}
+    return await scheduler.call(
+        bucket("POST /guilds/channels", category.guild.id),
+        lambda: category.create_text_channel(
+            name=dl.ask_channel_name, topic=ask_channel_topic(dl), overwrites=overwrites
+        ),
     )
-    await channel.set_permissions(target=dl.role, read_messages=True)
-    return channel
+
+
+async def create_role_and_channel(
+    dl: DiscussionLeader, category: discord.CategoryChannel, scheduler: RestScheduler, journal: Journal
+) -> tuple[discord.TextChannel, bool]:
+    """
+    Create the DL's role, then their ask-channel. DLs are independent, so this runs concurrently per DL.
+
+    A role or channel already recorded in the journal is reused instead of created again.
+    Returns the channel and whether anything had to be created.
+    """
+    guild = category.guild
+    role_id, channel_id = journal.get(f"role:{dl.email}"), journal.get(f"channel:{dl.email}")
+    dl.role = role_id and guild.get_role(int(role_id))
+    channel = channel_id and guild.get_channel(int(channel_id))
+    if dl.role and channel:
+        return channel, False
+
+    if not dl.role:
+        dl.role = await scheduler.call(
+            bucket("POST /guilds/roles", guild.id),
+            lambda: guild.create_role(name=dl.role_name, color=discord.Color.orange()),
+        )
+        journal.record(f"role:{dl.email}", dl.role.id)
+    if not channel:
+        channel = await create_ask_channel(dl, category, scheduler)
+        journal.record(f"channel:{dl.email}", channel.id)
+    return channel, True
+
+
+def roster_digest(dls: list[DiscussionLeader]) -> str:
+    """
+    Hash of the roles, channels and embed fields a setup makes for the roster, to tell whether an
+    interrupted setup's journal belongs to it. Emoji preferences are left out: a resumed setup keeps
+    the journaled emojis anyway.
+    """
+    rows = sorted((dl.email, dl.first, dl.last, dl.preferred or "", dl.sections) for dl in dls)
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+
+
+def setup_conflicts(
+    dls: list[DiscussionLeader], category: discord.CategoryChannel, state: GuildState, journal: Journal
+) -> list[str]:
+    """
+    Returns every DL whose role or ask-channel would clash with an existing one, or with another DL's.
+
+    This only looks at the guild state index, so a roster that needs ``/dl add`` instead is turned down
+    before any API call. Roles and channels in the journal were made by an interrupted run of the same
+    setup, and are not conflicts.
+    """
+    ours = {int(i) for i in (journal.entries("role:") | journal.entries("channel:")).values()}
+    conflicts = []
+    seen: dict[str, DiscussionLeader] = {}
+    for dl in dls:
+        name = channel_name(dl.ask_channel_name)
+        if (other := seen.setdefault(name, dl)) is not dl:
+            conflicts.append(f"{dl.full_name} and {other.full_name} would both get #{name}.")
+        if any(role.id not in ours for role in state.roles_named(dl.role_name)):
+            conflicts.append(f"{dl.full_name}: the role @{dl.role_name} already exists.")
+        if any(channel.id not in ours for channel in state.channels_named(name, category.id)):
+            conflicts.append(f"{dl.full_name}: #{name} already exists in {category.name}.")
+    return conflicts
+
+
+@dataclass
+class ExistingDL:
+    """A DL from a previous setup, recovered from their ask-channel topic and the role embed."""
+
+    email: str
+    channel: discord.TextChannel
+    role: discord.Role | None
+    role_emoji: str | None
+
+
+def find_existing_dls(category: discord.CategoryChannel, role_message: discord.Message) -> dict[str, ExistingDL]:
+    """Returns the DLs that already have an ask-channel in ``category``, by email."""
+    emojis = {}
+    for embed in role_message.embeds:
+        for f in embed.fields:
+            if match := EMBED_FIELD_PATTERN.match(f.value or ""):
+                emojis[int(match.group(2))] = match.group(1)
+
+    existing = {}
+    for channel in category.text_channels:
+        if match := ASK_TOPIC_PATTERN.search(channel.topic or ""):
+            role_id, email = int(match.group(1)), match.group(2)
+            existing[email] = ExistingDL(email, channel, category.guild.get_role(role_id), emojis.get(role_id))
+    return existing
+
+
+class RejectedEmoji(Exception):
+    """Discord rejected a DL's emoji with error 10014 (Unknown Emoji) while it was added as a reaction."""
+
+    def __init__(self, dl: DiscussionLeader):
+        super().__init__(dl.role_emoji)
+        self.dl = dl
+
+
+def bot_reactions(message: discord.Message) -> set[str]:
+    """Returns the (normalized) emojis the bot itself has reacted with on the message."""
+    return {normalize(str(r.emoji)) for r in message.reactions if r.me}
+
+
+@dataclass
+class Step:
+    """Part of a reconcile plan: the API calls it makes, and a coroutine that makes them."""
+
+    calls: list[str]
+    run: Callable[[], Awaitable]
+
+
+@dataclass
+class ReconcilePlan:
+    # Independent creates, edits and deletes. These run concurrently.
+    changes: list[Step] = field(default_factory=list)
+    # Embed edit and channel ordering, once every role and channel exists.
+    finalize: list[Step] = field(default_factory=list)
+    # Reaction changes, which must be made one at a time to keep their order.
+    reactions: list[Step] = field(default_factory=list)
+
+    @property
+    def steps(self) -> list[Step]:
+        return self.changes + self.finalize + self.reactions
+
+    def describe(self) -> list[str]:
+        """Returns every planned API call, in order."""
+        return [call for step in self.steps for call in step.calls]
+
+    async def apply(self) -> None:
+        await asyncio.gather(*(step.run() for step in self.changes))
+        await asyncio.gather(*(step.run() for step in self.finalize))
+        for step in self.reactions:
+            await step.run()
+
+
+def plan_reconcile(
+    dls: list[DiscussionLeader],
+    existing: dict[str, ExistingDL],
+    category: discord.CategoryChannel,
+    role_message: discord.Message,
+    scheduler: RestScheduler,
+    journal: Journal,
+) -> ReconcilePlan:
+    """
+    Plan the smallest set of API calls that brings a previous setup in line with ``dls``.
+
+    DLs are matched by email. Removed DLs lose their channel, role and reaction; new DLs get them;
+    everyone else only has their role, channel name or topic edited if it changed. Existing DLs keep
+    their emoji, and ``dls`` must already have emojis assigned.
+    """
+    guild = category.guild
+    reason = "Updating DL roster"
+    plan = ReconcilePlan()
+    roster = {dl.email for dl in dls}
+    channels: dict[str, discord.TextChannel] = {}
+    linked = {old.role.id for old in existing.values() if old.role}
+    unlinked_roles = {r.name: r for r in guild.roles if r.name.startswith("Team ") and r.id not in linked}
+    moved = False
+
+    for old in existing.values():
+        if old.email in roster:
+            continue
+        plan.changes.append(
+            Step(
+                [f"DELETE channel #{old.channel.name}"],
+                lambda old=old: scheduler.call(
+                    bucket("DELETE /channels", old.channel.id), lambda: old.channel.delete(reason=reason)
+                ),
+            )
+        )
+        if old.role:
+            plan.changes.append(
+                Step(
+                    [f"DELETE role @{old.role.name}"],
+                    lambda old=old: scheduler.call(
+                        bucket("DELETE /guilds/roles", guild.id), lambda: old.role.delete(reason=reason)
+                    ),
+                )
+            )
+
+    for dl in dls:
+        old = existing.get(dl.email)
+        if old is None:
+            # Reuse a leftover "Team …" role with the right name rather than creating a duplicate.
+            role = unlinked_roles.pop(dl.role_name, None)
+
+            async def create(dl=dl, role=role):
+                if role:
+                    journal.record(f"role:{dl.email}", role.id)
+                channels[dl.email], _ = await create_role_and_channel(dl, category, scheduler, journal)
+
+            calls = [] if role else [f"POST role @{dl.role_name}"]
+            plan.changes.append(Step(calls + [f"POST channel #{channel_name(dl.ask_channel_name)}"], create))
+            moved = True
+            continue
+
+        dl.role = old.role
+        channels[dl.email] = old.channel
+        calls = []
+        if dl.role is None:
+            calls.append(f"POST role @{dl.role_name}")
+        elif dl.role.name != dl.role_name:
+            calls.append(f"PATCH role @{dl.role.name} → @{dl.role_name}")
+        renamed = old.channel.name != channel_name(dl.ask_channel_name)
+        if dl.role is None or renamed or old.channel.topic != ask_channel_topic(dl):
+            calls.append(
+                f"PATCH channel #{old.channel.name}" + (f" → #{channel_name(dl.ask_channel_name)}" if renamed else "")
+            )
+        moved = moved or renamed
+        if not calls:
+            continue
+
+        async def update(dl=dl, channel=old.channel):
+            options = {}
+            if dl.role is None:
+                dl.role = await scheduler.call(
+                    bucket("POST /guilds/roles", guild.id),
+                    lambda: guild.create_role(name=dl.role_name, color=discord.Color.orange(), reason=reason),
+                )
+                options["overwrites"] = {**channel.overwrites, dl.role: discord.PermissionOverwrite(read_messages=True)}
+            elif dl.role.name != dl.role_name:
+                await scheduler.call(
+                    bucket("PATCH /guilds/roles", guild.id), lambda: dl.role.edit(name=dl.role_name, reason=reason)
+                )
+            if channel.name != channel_name(dl.ask_channel_name):
+                options["name"] = dl.ask_channel_name
+            if channel.topic != ask_channel_topic(dl):
+                options["topic"] = ask_channel_topic(dl)
+            if options:
+                await scheduler.call(
+                    bucket("PATCH /channels", channel.id), lambda: channel.edit(**options, reason=reason)
+                )
+
+        plan.changes.append(Step(calls, update))
+
+    if moved:
+        start = min((c.position for c in channels.values()), default=0)
+        ordered = sorted(dls, key=lambda d: d.display_name)
+        plan.finalize.append(
+            Step(
+                ["PATCH channel positions"],
+                lambda: bulk_reorder(scheduler, guild, [channels[d.email] for d in ordered], start, reason=reason),
+            )
+        )
+
+    # Diff against the reactions actually on the message rather than the embed, which is edited before them:
+    # after an interrupted run the embed can list an emoji that never got its reaction.
+    reacted = bot_reactions(role_message)
+    new_emojis = {normalize(dl.role_emoji) for dl in dls}
+    message_bucket = bucket("reactions", role_message.channel.id)
+    for e in sorted(reacted - new_emojis):
+        plan.reactions.append(
+            Step(
+                [f"DELETE reaction {e}"],
+                lambda e=e: scheduler.call(message_bucket, lambda: role_message.clear_reaction(e)),
+            )
+        )
+
+    async def add_reaction(dl: DiscussionLeader):
+        try:
+            await scheduler.call(message_bucket, lambda: role_message.add_reaction(dl.role_emoji))
+        except discord.HTTPException as e:
+            if e.code == 10014:  # Unknown emoji
+                raise RejectedEmoji(dl) from e
+            raise
+
+    # New reactions can only go at the end, so they are added in embed order among themselves.
+    for dl in sorted(dls, key=lambda d: d.last):
+        if normalize(dl.role_emoji) not in reacted:
+            plan.reactions.append(Step([f"PUT reaction {dl.role_emoji}"], lambda dl=dl: add_reaction(dl)))
+
+    old_fields = [f.value for embed in role_message.embeds for f in embed.fields]
+    if plan.steps or old_fields != [f.value for f in create_role_embed(dls).fields]:
+        plan.finalize.append(
+            Step(
+                [f"PATCH message {role_message.id} (role embed)"],
+                lambda: scheduler.call(
+                    bucket("PATCH /channels/messages", role_message.channel.id),
+                    lambda: role_message.edit(embed=create_role_embed(dls)),
+                ),
+            )
+        )
+
+    return plan
+
+
+def text_report(filename: str, lines: list[str]) -> discord.File:
+    """Wrap lines that may not fit in a message into a text file."""
+    return discord.File(io.BytesIO("\n".join(lines).encode("utf-8")), filename=filename)
 
 
 class DLSetup(commands.Cog):
@@ -181,12 +580,122 @@ class DLSetup(commands.Cog):
 
     group = app_commands.Group(name="dl", description="Manage discussion leader (DL) roles and channels.")
 
-    @group.command(name="add", description="Add a DL role and channel.")
+    async def read_roster(self, job: Job, csv_file: discord.Attachment) -> list[DiscussionLeader] | None:
+        """Parse the uploaded roster, reporting any problems. Returns ``None`` if it cannot be used."""
+        try:
+            dls, errors = await parse_csv(stream_lines(csv_file))
+        except (ValueError, aiohttp.ClientError) as e:
+            await job.send(f"Bad CSV format: {e}")
+            return None
+
+        if errors:
+            await job.send(
+                f"Bad CSV format: {len(errors)} row(s) could not be parsed. Fix them and try again.",
+                file=text_report("errors.txt", errors),
+            )
+            return None
+
+        job.update(f"CSV file successfully parsed: {len(dls)} DL(s).")
+        for dropped in drop_unsupported_emojis(dls):
+            job.note(f"Skipped emojis that are not supported by Discord for {dropped}")
+        return dls
+
+    @group.command(name="add", description="Update existing DL roles and channels to match an updated roster.")
+    @app_commands.describe(category="The category containing the ask-channels.")
+    @app_commands.describe(role_channel="The channel containing the role reaction embed.")
+    @app_commands.describe(message_id="The ID of the role reaction embed message.")
+    @app_commands.describe(csv_file="The updated CSV file.")
+    @app_commands.describe(apply="Apply the changes. If not set, only show the planned API calls.")
     async def dl_add(
         self,
         interaction: discord.Interaction,
+        category: discord.CategoryChannel,
+        role_channel: discord.TextChannel,
+        message_id: str,
+        csv_file: discord.Attachment,
+        apply: bool = False,
     ):
-        pass
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+
+        # Fetching the message can take a while under rate limits, so answer the interaction first.
+        await interaction.response.defer(thinking=True)
+        try:
+            role_message = await role_channel.fetch_message(int(message_id))
+        except (ValueError, discord.NotFound):
+            await interaction.followup.send(f"Could not find message with ID {message_id} in {role_channel.jump_url}.")
+            return
+
+        await self.bot.jobs.submit(
+            "dl add", interaction, lambda job: self.reconcile(job, category, role_message, csv_file, apply)
+        )
+
+    async def reconcile(
+        self,
+        job: Job,
+        category: discord.CategoryChannel,
+        role_message: discord.Message,
+        csv_file: discord.Attachment,
+        apply: bool,
+    ) -> str:
+        if (dls := await self.read_roster(job, csv_file)) is None:
+            return "Stopped: the roster could not be used."
+
+        scheduler = RestScheduler()
+        journal = Journal(f"dl-add:{category.id}:{role_message.id}")
+        applied = 0
+        while True:
+            # Existing DLs keep their emoji. New DLs don't get an emoji that is or was on the message,
+            # since its existing reactions belong to someone else.
+            existing = find_existing_dls(category, role_message)
+            taken = {old.role_emoji for old in existing.values()} | bot_reactions(role_message)
+            for dl in dls:
+                if dl.email not in existing:
+                    dl.emojis = [e for e in dl.emojis if normalize(e) not in taken]
+                elif previous := existing[dl.email].role_emoji:
+                    dl.emojis.insert(0, previous)
+            try:
+                dls = assign_role_emoji(dls)
+            except ValueError as e:
+                return str(e)
+
+            plan = plan_reconcile(dls, existing, category, role_message, scheduler, journal)
+            calls = plan.describe()
+            if not calls:
+                break
+            if not apply:
+                await job.send(
+                    f"Dry run: {len(calls)} API call(s) planned. Run again with `apply: True` to make them.",
+                    file=text_report("plan.txt", [f"{i}. {call}" for i, call in enumerate(calls, start=1)]),
+                )
+                return "Dry run finished, nothing was changed."
+
+            job.update(f"Applying {len(calls)} API call(s)...")
+            applied += 1
+            try:
+                await plan.apply()
+                break
+            except RejectedEmoji as e:
+                # The embed may already show the emoji, so plan again from the message as it is now.
+                # The rejected emoji is never assigned again.
+                mark_unsupported(e.dl.role_emoji)
+                job.note(
+                    f"Could not use emoji {e.dl.role_emoji} for {e.dl.full_name} because it is not supported by "
+                    "Discord. Next preferred option was selected, if available."
+                )
+                role_message = await scheduler.call(
+                    bucket("GET /channels/messages", role_message.channel.id),
+                    lambda m=role_message: m.channel.fetch_message(m.id),
+                )
+
+        # Also takes over the reaction roles of a message set up before the bot handled them.
+        self.bot.reaction_roles.bind(role_message.id, {dl.role_emoji: dl.role.id for dl in dls})
+        journal.finish()
+        if not applied:
+            return "Everything is already up to date."
+        log.info(f"Reconciled {len(dls)} DL(s): {scheduler.summary()}")
+        return f"Updated the DL roster in {role_message.jump_url} ({scheduler.summary()})."
 
     @group.command(name="setup", description="Set up roles and ask-channels for Discussion Leaders.")
     @app_commands.describe(category="The category to place the channels in.")
@@ -203,73 +712,143 @@ class DLSetup(commands.Cog):
             await interaction.response.send_message("TODO: Show help + CSV format")
             return
 
-        await interaction.response.defer(thinking=True)
-        dls: list[DiscussionLeader]
+        await self.bot.jobs.submit(
+            "dl setup", interaction, lambda job: self.run_setup(job, category, role_channel, csv_file)
+        )
+
+    async def run_setup(
+        self,
+        job: Job,
+        category: discord.CategoryChannel,
+        role_channel: discord.TextChannel,
+        csv_file: discord.Attachment,
+    ) -> str:
+        if (dls := await self.read_roster(job, csv_file)) is None:
+            return "Stopped: the roster could not be used."
+
+        # Re-running the same setup resumes from the journal of an interrupted run.
+        journal = Journal(f"dl-setup:{category.id}:{role_channel.id}")
+        digest = roster_digest(dls)
+        if journal.resumed and journal.get("roster") not in (None, digest):
+            # Its roles, channels and reactions belong to the other roster, so they cannot be reused.
+            return (
+                "Stopped: a setup of a different roster was interrupted in this category and channel. "
+                "Run it again with the roster it started with, then use `/dl add` for the changes."
+            )
+        if journal.resumed:
+            job.note("Resumed an interrupted setup. Steps completed before were skipped.")
+            # Keep the emojis from the interrupted run, since some reactions may already be on the message.
+            for dl in dls:
+                if previous := journal.get(f"emoji:{dl.email}"):
+                    dl.emojis.insert(0, previous)
+
+        if conflicts := setup_conflicts(dls, category, self.bot.guild_state[category.guild], journal):
+            await job.send(
+                f"{len(conflicts)} DL(s) clash with existing roles or channels. Use `/dl add` to update an "
+                "existing setup, or rename or delete them first.",
+                file=text_report("conflicts.txt", conflicts),
+            )
+            return "Stopped: the roster clashes with existing roles or channels."
 
         try:
-            b = await csv_file.read()
-            dls = parse_csv(b.decode("utf-8"))
+            dls = assign_role_emoji(dls)
         except ValueError as e:
-            await interaction.followup.send(f"Bad CSV format: ```{''.join(traceback.format_exception(e))}```")
-            return
-
-        await interaction.followup.send("CSV file successfully parsed. Creating roles...")
-
-        # Sort by preferred name for channel creation.
-        dls = assign_role_emoji(dls)
-        for dl in sorted(dls, key=lambda d: d.display_name):
-            # Create role and channel for DL.
-            dl.role = await interaction.guild.create_role(name=dl.role_name, color=discord.Color.orange())
-            channel = await create_ask_channel(dl, category)
-            await interaction.followup.send(f"Created role <@&{dl.role.id}> and {channel.jump_url} for {dl.full_name}.")
-
-        role_message = await role_channel.send(embed=create_role_embed(dls))
+            return str(e)
+        journal.record("roster", digest)
+        for dl in dls:
+            journal.record(f"emoji:{dl.email}", dl.role_emoji)
+
+        scheduler = RestScheduler()
+        start = max((c.position for c in category.text_channels), default=-1) + 1
+        if "start" in journal:
+            start = int(journal.get("start"))
+        journal.record("start", start)
+
+        async def create(dl: DiscussionLeader) -> discord.TextChannel:
+            channel, created = await create_role_and_channel(dl, category, scheduler, journal)
+            job.step(f"Created role <@&{dl.role.id}> and {channel.jump_url} for {dl.full_name}." if created else "")
+            return channel
+
+        # Channels finish in arbitrary order, so sort by preferred name and fix positions in one call.
+        dls = sorted(dls, key=lambda d: d.display_name)
+        job.update("Creating roles and ask-channels:", total=len(dls))
+        channels = await asyncio.gather(*(create(dl) for dl in dls))
+        await bulk_reorder(scheduler, category.guild, channels, start, reason="Sorting DL channels")
+        log.info(f"Created roles and channels for {len(dls)} DL(s): {scheduler.summary()}")
+
+        # The message and its reactions go through the scheduler too, so the summary is the setup's full REST cost.
+        role_message = None
+        if message_id := journal.get("message"):
+            try:
+                role_message = await scheduler.call(
+                    bucket("GET /channels/messages", role_channel.id),
+                    lambda: role_channel.fetch_message(int(message_id)),
+                )
+            except discord.NotFound:
+                journal.forget("reaction:")
+            else:
+                # The emojis may have changed since it was sent, e.g. after Discord rejected one.
+                await scheduler.call(
+                    bucket("PATCH /channels/messages", role_channel.id),
+                    lambda: role_message.edit(embed=create_role_embed(dls)),
+                )
+        if role_message is None:
+            role_message = await scheduler.call(
+                bucket("POST /channels/messages", role_channel.id),
+                lambda: role_channel.send(embed=create_role_embed(dls)),
+            )
+            journal.record("message", role_message.id)
+        message_bucket = bucket("reactions", role_channel.id)
 
         # Add the reactions to the message.
-        # This is the ONLY way to:
-        #  - guarantee order of reaction that is consistent with the embed because Carl-bot's `!rr addmany`
-        #  does not respect the order of the reactions provided.
-        #  - guarantee(-ish) that the assigned role emoji will work. (-ish) part because
-        #  there is a tiny chance it is stuck infinitely if no good options are found.
-        #  > Yes, really. This is the only way to do it. Even if a Unicode emoji displays
-        #  correctly on Discord doesn't mean it is supported.
+        # Adding them ourselves is the ONLY way to guarantee order of reaction that is consistent with
+        # the embed, since members can only add reactions after the existing ones.
+        # Emojis were already checked against the offline index, so this normally costs exactly one
+        # `add_reaction` per DL. If Discord still rejects one, it is remembered and never tried again.
         while True:
             run_again = False
+            job.update(f"Adding reactions to {role_message.jump_url}:", total=len(dls))
             sorted_dls = sorted(dls, key=lambda d: d.last)
             for dl in sorted_dls:
+                if f"reaction:{dl.role_emoji}" in journal:
+                    job.step()
+                    continue
                 try:
-                    await role_message.add_reaction(dl.role_emoji)
+                    await scheduler.call(message_bucket, lambda dl=dl: role_message.add_reaction(dl.role_emoji))
+                    journal.record(f"reaction:{dl.role_emoji}")
+                    job.step(f"Added {dl.role_emoji} for {dl.full_name}.")
                     continue
                 except discord.HTTPException as e:
                     # STUPID FUCKING EDGE CASE BECAUSE OF OUTDATED EMOJI SUPPORT
                     if e.code == 10014:  # Unknown emoji
-                        await interaction.followup.send(
+                        mark_unsupported(dl.role_emoji)
+                        job.note(
                             f"Could not use emoji {dl.role_emoji} for {dl.full_name} because it is not "
-                            f"supported by Discord. Next preferred option will be selected, if available."
+                            f"supported by Discord. Next preferred option was selected, if available."
                         )
                         # If this happens, start over.
                         if dl.role_emoji in dl.emojis:
                             dl.emojis.remove(dl.role_emoji)
                         assign_role_emoji(dls)
-                        await role_message.edit(embed=create_role_embed(dls))
-                        await role_message.clear_reactions()
+                        for d in dls:
+                            journal.record(f"emoji:{d.email}", d.role_emoji)
+                        await scheduler.call(
+                            bucket("PATCH /channels/messages", role_channel.id),
+                            lambda: role_message.edit(embed=create_role_embed(dls)),
+                        )
+                        await scheduler.call(message_bucket, role_message.clear_reactions)
+                        journal.forget("reaction:")
                         run_again = True
                         break
             if not run_again:
                 break  # woo: everything went perfectly
 
-        await interaction.followup.send(
-            content="\n".join(
-                [
-                    "# Set up reaction roles",
-                    f"A message have been sent for role selection: {role_message.jump_url}. "
-                    "Carl-bot handles role assignments, not this bot.",
-                    "To add reactions for role selection, copy and send the following command:",
-                    f"```/reactionrole addmany channel:{role_channel.id} message_id:{role_message.id} emoji_role_pair:",
-                    *(f"{d.role_emoji} {d.role.id}" for d in dls),
-                    "```",
-                ]
-            )
+        self.bot.reaction_roles.bind(role_message.id, {dl.role_emoji: dl.role.id for dl in dls})
+        journal.finish()
+
+        return (
+            f"Set up {len(dls)} DL(s) ({scheduler.summary()}). "
+            f"Reacting to {role_message.jump_url} now assigns their roles."
         )
 
 
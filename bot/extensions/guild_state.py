@@ -0,0 +1,68 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+from bot.guild_state import ChannelInfo, GuildStates, RoleInfo
+
+log = logging.getLogger()
+
+
+class GuildStateSync(commands.Cog):
+    """Keeps the bot's guild state index in step with the channel and role events from the gateway."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @property
+    def states(self) -> GuildStates:
+        return self.bot.guild_state
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        log.info(
+            f"Guild {guild.name} (ID: {guild.id}) available, since the last snapshot: {self.states.refresh(guild)}"
+        )
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.states.refresh(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.states.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.states[channel.guild].put_channel(ChannelInfo.of(channel))
+        self.states.changed(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.states[after.guild].put_channel(ChannelInfo.of(after))
+        self.states.changed(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.states[channel.guild].remove_channel(channel.id)
+        self.states.changed(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.states[role.guild].put_role(RoleInfo.of(role))
+        self.states.changed(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self.states[after.guild].put_role(RoleInfo.of(after))
+        self.states.changed(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.states[role.guild].remove_role(role.id)
+        self.states.changed(role.guild.id)
+
+
+async def setup(bot: commands.Bot):
+    log.info("Loading GuildStateSync extension")
+    await bot.add_cog(GuildStateSync(bot))
@@ -0,0 +1,57 @@
+import logging
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+log = logging.getLogger()
+
+
+class Jobs(commands.Cog):
+    """Lists and cancels the background jobs started by long admin commands."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    group = app_commands.Group(name="jobs", description="Show or cancel background jobs.")
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return False
+        return True
+
+    @group.command(name="status", description="Show the status of a job, or of the most recent jobs")
+    @app_commands.describe(job_id="The job to show. If not set, the 10 most recent jobs are shown.")
+    async def status(self, interaction: discord.Interaction, job_id: int = None):
+        if job_id is not None:
+            if (job := self.bot.jobs.get(job_id, interaction.guild_id)) is None:
+                await interaction.response.send_message(f"There is no job #{job_id}.", ephemeral=True)
+                return
+            await interaction.response.send_message(f"{job.summary()}\n{job.link}", ephemeral=True)
+            return
+
+        jobs = self.bot.jobs.in_guild(interaction.guild_id)[:10]
+        if not jobs:
+            await interaction.response.send_message(
+                "No jobs have been started in this server since the bot started.", ephemeral=True
+            )
+            return
+        await interaction.response.send_message("\n\n".join(job.summary() for job in jobs), ephemeral=True)
+
+    @group.command(name="cancel", description="Cancel a queued or running job")
+    @app_commands.describe(job_id="The job to cancel.")
+    async def cancel(self, interaction: discord.Interaction, job_id: int):
+        if not self.bot.jobs.cancel(job_id, interaction.guild_id):
+            await interaction.response.send_message(f"Job #{job_id} is not queued or running.", ephemeral=True)
+            return
+        # Jobs are journaled, so running the same command again resumes where it was cancelled.
+        log.info(f"{interaction.user} cancelled job #{job_id}")
+        await interaction.response.send_message(
+            f"Cancelled job #{job_id}. Run the same command again to resume it.", ephemeral=True
+        )
+
+
+async def setup(bot: commands.Bot):
+    log.info("Loading Jobs extension")
+    await bot.add_cog(Jobs(bot))
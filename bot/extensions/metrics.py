@@ -0,0 +1,96 @@
+import logging
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from bot.constants import Bot as BotConfig
+from bot.metrics import metrics
+
+log = logging.getLogger()
+
+
+class Metrics(commands.Cog):
+    """Records command latencies and serves all metrics on a local Prometheus endpoint."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.runner: web.AppRunner | None = None
+        self._tree_on_error = bot.tree.on_error
+
+    async def cog_load(self) -> None:
+        self.bot.tree.on_error = self.on_app_command_error
+        if not BotConfig.metrics_port:
+            return
+        app = web.Application()
+        app.add_routes([web.get("/metrics", self.serve_metrics)])
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, BotConfig.metrics_host, BotConfig.metrics_port).start()
+        log.info(f"Serving metrics on http://{BotConfig.metrics_host}:{BotConfig.metrics_port}/metrics")
+
+    async def cog_unload(self) -> None:
+        self.bot.tree.on_error = self._tree_on_error
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def serve_metrics(self, request: web.Request) -> web.Response:
+        metrics.heartbeat_latency = self.bot.latency
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    @staticmethod
+    def elapsed(interaction: discord.Interaction) -> float:
+        return (discord.utils.utcnow() - interaction.created_at).total_seconds()
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command):
+        metrics.observe_command(command.qualified_name, self.elapsed(interaction))
+
+    async def on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        name = interaction.command.qualified_name if interaction.command else "unknown"
+        metrics.observe_command(name, self.elapsed(interaction), failed=True)
+        await self._tree_on_error(interaction, error)
+
+    @app_commands.command(name="metrics", description="Show command and API latency since the bot started")
+    async def show_metrics(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+
+        def rows(histograms, limit=10):
+            top = sorted(histograms.items(), key=lambda kv: kv[1].sum, reverse=True)[:limit]
+            return [
+                f"{name:<40} {h.count:>6} {h.quantile(0.5):>7} {h.quantile(0.95):>7} {h.sum:>9.1f}" for name, h in top
+            ]
+
+        header = f"{'':<40} {'count':>6} {'p50 ≤':>7} {'p95 ≤':>7} {'total':>9}"
+        await interaction.response.send_message(
+            "\n".join(
+                [
+                    "```",
+                    "Commands (seconds)",
+                    header,
+                    *rows(metrics.commands),
+                    "",
+                    "Background jobs (seconds)",
+                    header,
+                    *rows(metrics.jobs),
+                    "",
+                    "Busiest API routes (seconds)",
+                    header,
+                    *rows(metrics.routes),
+                    "",
+                    f"429 responses: {metrics.rate_limited}",
+                    f"Time sleeping on rate limits: {metrics.rate_limit_sleep:.1f}s",
+                    f"Gateway heartbeat latency: {self.bot.latency * 1000:.0f}ms",
+                    "```",
+                ]
+            ),
+            ephemeral=True,
+        )
+
+
+async def setup(bot: commands.Bot):
+    log.info("Loading Metrics extension")
+    await bot.add_cog(Metrics(bot))
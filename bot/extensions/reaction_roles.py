@@ -0,0 +1,36 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+from bot.reaction_roles import RoleQueue
+
+log = logging.getLogger()
+
+
+class ReactionRoles(commands.Cog):
+    """Grants and removes the roles bound to reactions on the DL and rules messages."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.queue = RoleQueue(bot.http)
+
+    def handle(self, payload: discord.RawReactionActionEvent, add: bool) -> None:
+        if payload.guild_id is None or payload.user_id == self.bot.user.id:
+            return
+        if (role_id := self.bot.reaction_roles.get(payload.message_id, payload.emoji)) is None:
+            return
+        self.queue.push(payload.guild_id, payload.user_id, role_id, add)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        self.handle(payload, add=True)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        self.handle(payload, add=False)
+
+
+async def setup(bot: commands.Bot):
+    log.info("Loading ReactionRoles extension")
+    await bot.add_cog(ReactionRoles(bot))
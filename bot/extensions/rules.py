@@ -1,103 +1,174 @@
 import logging
+from dataclasses import replace
 
 import discord
-from discord import app_commands, Embed
+from discord import app_commands
 from discord.ext import commands
 
-log = logging.getLogger()
-
-rules_embed = Embed(title="Rules")
-rules_embed.description = (
-    "Welcome! This is a student-run Discord server for Professor Ta’s classes. To keep things "
-    "running smoothly, we kindly ask that you follow a few simple rules."
-)
-rules_embed.add_field(
-    name="😀 Don’t be an asshole", value="No harassment of any kind. Be nice to one another.", inline=False
-)
-rules_embed.add_field(
-    name="🤓 Do not violate the course guidelines and/or policies",
-    value="Don’t do anything that will get you kicked out of the class here, like cheating or sharing your solutions "
-    "on this server.",
-    inline=False,
-)
-rules_embed.add_field(
-    name="😴 Respect people’s boundaries",
-    value="This server was created to help students connect with their graders and mentors, who are here voluntarily "
-    "to support your success in the course. Please feel free to reach out for help but also be considerate of "
-    "their time.",
-    inline=False,
-)
-
-disclaimer_embed = Embed(title="Disclaimer")
-disclaimer_embed.description = "\n\n".join(
-    f"-# {para}"
-    for para in (
-        "This Discord server is independently operated by current and former students of Professor Ta. "
-        "It is not affiliated with, authorized, endorsed, or officially associated with the University or the "
-        "Department of Computer Science in any capacity.",
-        "**Your participation is entirely optional**, and the content shared here is intended solely for informational "
-        "purposes. Any announcements or communications from tutors, graders, discussion leaders, or other individuals "
-        "in an official capacity on Discord are provided for convenience and do not replace official channels as "
-        "prescribed by the course.",
-        "The Department of Computer Science, Professor Ta, and members of his team are not officially associated with "
-        "this server and assume no responsibility for its content or moderation. Any advice or information provided "
-        "here should be cross-checked with official sources. The server maintainers are not responsible for any "
-        "inaccuracies or problems that may arise from using this server.",
-        "We’ve kept this space running for our fellow Duclings since Spring 2021 and hope to pass it on to future "
-        "cohorts — please help us maintain it by adhering to the rules and using common sense.",
-    )
-)
+from bot.rest import RestScheduler, bucket
+from bot.rules import REACTION, TEMPLATE_PATH, RulesPost, RulesPosts, RulesTemplate
 
-pick_roles_embed = Embed(title="Accept rules and select your roles!")
-pick_roles_embed.description = (
-    "Click on the reaction below to indicate your agreement with the rules and gain access "
-    "to the server. After that, proceed to <#815094070900031530> to obtain your roles!"
-)
+log = logging.getLogger()
 
 
 class Rules(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.posts = RulesPosts()
+        self.template_path = TEMPLATE_PATH
 
     group = app_commands.Group(name="rules", description="Manage server rules")
 
+    def bind_role(self, message: discord.abc.Snowflake, role: discord.Role | None) -> str:
+        """Have the bot assign ``role`` to everyone who reacts to the rules message."""
+        if role is None:
+            return "Pass `role` to have the bot assign a role for the reaction."
+        self.bot.reaction_roles.bind(message.id, {REACTION: role.id})
+        return f"Reacting with {REACTION} now assigns {role.mention}."
+
+    @staticmethod
+    def can_bind(member: discord.Member, role: discord.Role) -> bool:
+        """Members can only hand out roles below their own top role, as in the server settings."""
+        return member.id == member.guild.owner_id or role < member.top_role
+
+    def template(self, guild_id: int) -> RulesTemplate:
+        """The guild's rules template from its config, or the default one."""
+        return RulesTemplate.load(self.bot.guild_config.get(guild_id).rules_template or self.template_path)
+
+    def stored_message(self, post: RulesPost) -> discord.PartialMessage:
+        """A handle on a recorded post, to edit it without fetching it first."""
+        channel = self.bot.get_partial_messageable(post.channel_id, guild_id=post.guild_id)
+        return channel.get_partial_message(post.message_id)
+
     @group.command(name="post", description="Post the server rules")
     @app_commands.describe(destination="The channel to post to. If not provided, the current channel will be used.")
-    async def post(self, interaction: discord.Interaction, destination: discord.TextChannel = None):
+    @app_commands.describe(role="The role to assign to members who react to the rules.")
+    async def post(
+        self, interaction: discord.Interaction, destination: discord.TextChannel = None, role: discord.Role = None
+    ):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("You do not have permission to invoke this command.")
             return
+        if role and not self.can_bind(interaction.user, role):
+            await interaction.response.send_message("You can only assign roles below your own top role.")
+            return
 
-        welcome = "# Welcome to CSC Duclings!"
-        embeds = [rules_embed, disclaimer_embed, pick_roles_embed]
+        template = self.template(interaction.guild_id)
         if destination:
-            message = await destination.send(content=welcome, embeds=embeds)
+            message = await destination.send(content=template.content, embeds=template.embeds)
             await interaction.response.send_message(content=message.jump_url)
-            await message.add_reaction("👍")
-            await interaction.followup.send("Make sure that carl-bot is set up to assign role for the reaction.")
+            await message.add_reaction(REACTION)
+            self.posts.record(RulesPost(message.id, destination.id, destination.guild.id, template.digest))
+            await interaction.followup.send(self.bind_role(message, role))
         else:
-            await interaction.response.send_message(content=welcome, embeds=embeds)
+            await interaction.response.send_message(content=template.content, embeds=template.embeds)
 
     @group.command(name="update", description="Update the server rules")
-    async def rules_update(self, interaction: discord.Interaction, channel: discord.TextChannel, message_id: str):
-        await interaction.response.defer(thinking=True)
+    @app_commands.describe(
+        channel="The channel of the message. Not needed for messages the bot already posted or updated.",
+        message_id="The rules message to update. If not provided, every recorded rules message is updated.",
+        role="The role to assign to members who react to the rules.",
+    )
+    async def rules_update(
+        self,
+        interaction: discord.Interaction,
+        channel: discord.TextChannel = None,
+        message_id: str = None,
+        role: discord.Role = None,
+    ):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+        if role and not self.can_bind(interaction.user, role):
+            await interaction.response.send_message("You can only assign roles below your own top role.")
+            return
 
-        try:
-            message = await channel.fetch_message(int(message_id))
-        except (ValueError, discord.NotFound) as e:
-            await interaction.followup.send(f"Could not find message with ID {message_id} in {channel.jump_url}.")
+        template = self.template(interaction.guild_id)
+        if message_id is None:
+            if role is not None:
+                await interaction.response.send_message("Pass `message_id` along with `role`.")
+                return
+            await self.update_all(interaction, template)
             return
 
-        if message.author.id != self.bot.user.id:
-            await interaction.followup.send("The bot is not the author of this message.")
+        post = self.posts.get(int(message_id), interaction.guild_id) if message_id.isdigit() else None
+        if post and post.digest == template.digest:
+            # Nothing to edit, and the reaction was added when the post was recorded.
+            message = self.stored_message(post)
+            await interaction.response.send_message(
+                f"{message.jump_url} already shows version `{template.version}` of the rules. "
+                f"{self.bind_role(message, role)}"
+            )
+            return
+
+        await interaction.response.defer(thinking=True)
+        if post:
+            message = self.stored_message(post)
+            try:
+                await message.edit(content=template.content, embeds=template.embeds)
+            except discord.NotFound:
+                self.posts.forget(post.message_id)
+                await interaction.followup.send(f"Message {message_id} no longer exists.")
+                return
+        else:
+            if channel is None:
+                await interaction.followup.send("Pass the `channel` of the message.")
+                return
+            try:
+                message = await channel.fetch_message(int(message_id))
+            except (ValueError, discord.NotFound) as e:
+                await interaction.followup.send(f"Could not find message with ID {message_id} in {channel.jump_url}.")
+                return
+
+            if message.author.id != self.bot.user.id:
+                await interaction.followup.send("The bot is not the author of this message.")
+                return
+
+            await message.edit(content=template.content, embeds=template.embeds)
+            await message.add_reaction(REACTION)
+            post = RulesPost(message.id, channel.id, channel.guild.id, template.digest)
+
+        self.posts.record(replace(post, digest=template.digest))
+        await interaction.followup.send(
+            f"Edited {message.jump_url} to version `{template.version}`. {self.bind_role(message, role)}"
+        )
+
+    async def update_all(self, interaction: discord.Interaction, template: RulesTemplate) -> None:
+        """Edit every recorded rules post of the guild that shows an older template, concurrently."""
+        stale = self.posts.stale(interaction.guild_id, template.digest)
+        if not stale:
+            await interaction.response.send_message(
+                f"Every rules message already shows version `{template.version}` of the rules."
+            )
             return
 
-        welcome = "# Welcome to CSC Duclings!"
-        embeds = [rules_embed, disclaimer_embed, pick_roles_embed]
-        await message.edit(content=welcome, embeds=embeds)
-        await message.add_reaction("👍")
+        await interaction.response.defer(thinking=True)
+        scheduler = RestScheduler()
+
+        async def edit(post: RulesPost) -> str | None:
+            """Returns a problem to report, if any."""
+            message = self.stored_message(post)
+            try:
+                await message.edit(content=template.content, embeds=template.embeds)
+            except discord.NotFound:
+                self.posts.forget(post.message_id)
+                return f"- Message {post.message_id} in <#{post.channel_id}> no longer exists, forgot it."
+            except discord.HTTPException as e:
+                return f"- Could not edit {message.jump_url}: {e}"
+            self.posts.record(replace(post, digest=template.digest))
+
+        problems = await scheduler.gather(
+            (bucket("PATCH /channels/messages", post.channel_id), lambda post=post: edit(post)) for post in stale
+        )
+        problems = [problem for problem in problems if problem]
         await interaction.followup.send(
-            f"Edited {message.jump_url}. Make sure that carl-bot is set up to assign role for the reaction."
+            "\n".join(
+                [
+                    f"Updated {len(stale) - len(problems)} rules message(s) to version `{template.version}` "
+                    f"({scheduler.summary()}).",
+                    *problems[:20],
+                ]
+            )
         )
 
 
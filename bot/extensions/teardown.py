@@ -0,0 +1,169 @@
+import asyncio
+import fnmatch
+import logging
+from collections.abc import AsyncIterator
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot.constants import Bot as BotConfig
+from bot.jobs import Job
+from bot.rest import RestScheduler, bucket
+
+log = logging.getLogger()
+
+MEMBER_PAGE_SIZE = 1000
+
+
+def select_roles(guild: discord.Guild, pattern: str | None, bound: set[int]) -> list[discord.Role]:
+    """Returns the roles whose name matches the glob ``pattern`` (e.g. "Team *"), or whose ID is in ``bound``."""
+    return [
+        role
+        for role in guild.roles
+        if not role.is_default()
+        and (role.id in bound or (pattern and fnmatch.fnmatch(role.name.casefold(), pattern.casefold())))
+    ]
+
+
+async def iter_members(guild: discord.Guild) -> AsyncIterator[dict]:
+    """
+    Page through every member of the guild over REST.
+
+    ``Guild.fetch_members`` refuses to run without the members intent, which the lean profile does not
+    subscribe to; the REST route itself only needs the intent enabled for the application.
+    """
+    after = None
+    while True:
+        page = await guild._state.http.get_members(guild.id, MEMBER_PAGE_SIZE, after)
+        for member in page:
+            yield member
+        if len(page) < MEMBER_PAGE_SIZE:
+            return
+        after = page[-1]["user"]["id"]
+
+
+class Teardown(commands.Cog):
+    """Removes the roles of a finished semester."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="teardown", description="Delete or clear semester roles, e.g. every “Team …” role")
+    @app_commands.describe(
+        pattern="Roles to select by name, e.g. “Team *” or “CSC 2*”",
+        message_id="Select the roles bound to this reaction role message, e.g. the DL role embed",
+        mode="Delete the roles, or keep them and remove them from every member",
+        apply="Apply the changes. If not set, only show what would be changed.",
+    )
+    @app_commands.choices(
+        mode=[
+            app_commands.Choice(name="delete roles", value="delete"),
+            app_commands.Choice(name="remove from members", value="strip"),
+        ]
+    )
+    async def teardown(
+        self,
+        interaction: discord.Interaction,
+        pattern: str = None,
+        message_id: str = None,
+        mode: str = "delete",
+        apply: bool = False,
+    ):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You do not have permission to invoke this command.")
+            return
+
+        try:
+            bound = set(self.bot.reaction_roles.bound(int(message_id)).values()) if message_id else set()
+        except ValueError:
+            await interaction.response.send_message(f"Invalid message ID: {message_id}.")
+            return
+        roles = select_roles(interaction.guild, pattern, bound)
+        if not roles:
+            await interaction.response.send_message("No roles match. Pass a `pattern`, a `message_id`, or both.")
+            return
+
+        # The bot can only manage roles below its own top role.
+        top = interaction.guild.me.top_role
+        skipped = [role for role in roles if role.managed or role >= top]
+        roles = [role for role in roles if role not in skipped]
+        if not roles:
+            await interaction.response.send_message("The bot cannot manage any of the matching roles.")
+            return
+
+        work = self.delete_roles if mode == "delete" else self.strip_roles
+        job = await self.bot.jobs.submit(f"teardown ({mode})", interaction, lambda job: work(job, roles, apply))
+        for role in skipped:
+            job.note(f"Skipped @{role.name}: it is managed by an integration or not below the bot's top role.")
+
+    async def delete_roles(self, job: Job, roles: list[discord.Role], apply: bool) -> str:
+        """Deleting a role takes it away from every member at once, at the cost of one call per role."""
+        names = ", ".join(f"@{role.name}" for role in roles)
+        if not apply:
+            return f"Dry run: would delete {len(roles)} role(s): {names}. Run again with `apply: True`."
+
+        scheduler = RestScheduler()
+        job.update("Deleting roles:", total=len(roles))
+
+        async def delete(role: discord.Role):
+            await scheduler.call(
+                bucket("DELETE /guilds/roles", role.guild.id), lambda: role.delete(reason="Semester teardown")
+            )
+            job.step(f"Deleted @{role.name}.")
+
+        await asyncio.gather(*(delete(role) for role in roles))
+        self.bot.reaction_roles.forget_roles({role.id for role in roles})
+        log.info(f"Deleted {len(roles)} role(s): {scheduler.summary()}")
+        return f"Deleted {len(roles)} role(s) ({scheduler.summary()}): {names}."
+
+    async def strip_roles(self, job: Job, roles: list[discord.Role], apply: bool) -> str:
+        """
+        Remove the roles from every member who has them, keeping the roles themselves.
+
+        Each role is removed on its own, so roles a member gains while the job runs (e.g. from a reaction)
+        are left alone. Members usually have one of the roles, so this is one call per member.
+        """
+        guild = roles[0].guild
+        selected = {role.id for role in roles}
+        job.update("Finding members with the roles:")
+        removals: list[tuple[int, int]] = []
+        members = 0
+        async for member in iter_members(guild):
+            if found := [int(role_id) for role_id in member["roles"] if int(role_id) in selected]:
+                members += 1
+                removals += [(int(member["user"]["id"]), role_id) for role_id in found]
+            job.step(f"Read {job.done + 1} member(s), {members} with the roles.")
+
+        names = ", ".join(f"@{role.name}" for role in roles)
+        if not apply:
+            return (
+                f"Dry run: would remove {names} from {members} member(s), {len(removals)} API call(s). "
+                "Run again with `apply: True`."
+            )
+
+        scheduler = RestScheduler(per_bucket=BotConfig.member_edit_concurrency)
+        job.update("Removing roles from members:", total=len(removals))
+
+        async def remove(user_id: int, role_id: int):
+            try:
+                await guild._state.http.remove_role(guild.id, user_id, role_id, reason="Semester teardown")
+            except discord.NotFound:
+                pass  # Left the server since the member list was read.
+            job.step()
+
+        await scheduler.gather(
+            (
+                bucket("DELETE /guilds/members/roles", guild.id),
+                lambda user_id=user_id, role_id=role_id: remove(user_id, role_id),
+            )
+            for user_id, role_id in removals
+        )
+        rate = members / scheduler.elapsed if scheduler.elapsed else 0.0
+        log.info(f"Removed {len(roles)} role(s) from {members} member(s): {scheduler.summary()}")
+        return f"Removed {names} from {members} member(s) ({scheduler.summary()}, {rate:.1f} members/s)."
+
+
+async def setup(bot: commands.Bot):
+    log.info("Loading Teardown extension")
+    await bot.add_cog(Teardown(bot))
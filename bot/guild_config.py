@@ -0,0 +1,79 @@
+"""
+Per-guild configuration, for running one bot on several course servers.
+
+Each guild can have a ``config/guilds/<guild id>.toml`` file (see ``BOT_GUILD_CONFIG_DIR``)::
+
+    name = "CSC 413"
+    rules_template = "config/rules/csc413.json"
+
+    [categories]
+    csc413 = 1234567890
+
+    [channels]
+    select_class = 1234567891
+
+A guild's file is only read the first time a command in that guild needs it, so guilds that are
+never used cost nothing. The primary guild (``GUILD_ID``) uses the channels and categories from
+``bot/constants.py`` as defaults, and guilds without a file get an empty configuration.
+"""
+
+import logging
+import tomllib
+from pathlib import Path
+
+from pydantic import BaseModel, Field, ValidationError
+
+from bot.constants import Bot as BotConfig
+from bot.constants import Categories, Channels, Guild
+
+log = logging.getLogger()
+
+
+class GuildConfig(BaseModel):
+    id: int
+    name: str = ""
+    # e.g. {"csc215": 1057886582100721715}, for /rollover sources given by name
+    categories: dict[str, int] = Field(default_factory=dict)
+    channels: dict[str, int] = Field(default_factory=dict)
+    # rules message of this guild, bot/data/rules.json if unset
+    rules_template: Path | None = None
+
+
+def primary_config() -> GuildConfig:
+    return GuildConfig(id=Guild.id, categories=Categories.model_dump(), channels=Channels.model_dump())
+
+
+class GuildConfigs:
+    def __init__(self, directory: Path = BotConfig.guild_config_dir):
+        self.directory = directory
+        self._configs: dict[int, GuildConfig] = {}
+
+    def path(self, guild_id: int) -> Path:
+        return self.directory / f"{guild_id}.toml"
+
+    def get(self, guild_id: int) -> GuildConfig:
+        if guild_id not in self._configs:
+            self._configs[guild_id] = self.load(guild_id)
+        return self._configs[guild_id]
+
+    def load(self, guild_id: int) -> GuildConfig:
+        """Read the guild's config file, on top of the defaults for the primary guild."""
+        config = primary_config() if guild_id == Guild.id else GuildConfig(id=guild_id)
+        path = self.path(guild_id)
+        if not path.exists():
+            return config
+        try:
+            overrides = tomllib.loads(path.read_text(encoding="utf-8"))
+            for section in ("categories", "channels"):
+                overrides[section] = getattr(config, section) | overrides.get(section, {})
+            config = GuildConfig.model_validate(config.model_dump() | overrides | {"id": guild_id})
+        except (tomllib.TOMLDecodeError, ValidationError) as e:
+            # A broken file should not take the guild down; its commands fall back to the defaults.
+            log.error(f"Ignoring invalid guild config {path}: {e}")
+            return config
+        log.info(f"Loaded the config of guild {guild_id} from {path}")
+        return config
+
+    def forget(self, guild_id: int) -> None:
+        """Drop the cached config, so the file is read again the next time it is needed."""
+        self._configs.pop(guild_id, None)
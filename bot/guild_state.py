@@ -0,0 +1,196 @@
+"""
+An index of each guild's channels, categories and roles, for checking commands before they make API calls.
+
+The gateway already sends every channel and role when a guild becomes available and keeps them up to
+date afterwards; ``GuildState`` indexes them by name (channels per category) so a command can look up
+conflicts, such as a role or channel that already exists, without asking Discord. The guild state
+cog keeps the index in step with the channel and role events.
+
+Each guild's state is snapshotted to ``data/guild_state/<guild id>.json`` a few seconds after it
+changes. When the bot starts, the snapshot is compared with what the gateway sent, so changes made
+while the bot was offline (e.g. by hand in the middle of a rollover) are logged.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import discord
+
+from bot.constants import Bot as BotConfig
+
+log = logging.getLogger()
+
+STATE_DIR = BotConfig.data_dir / "guild_state"
+SAVE_DELAY = 5.0  # Seconds of quiet before a changed state is written, so bursts of events cost one write.
+
+
+def channel_name(name: str) -> str:
+    """Returns the name as Discord stores it: text channel names are lowercase, with dashes for spaces."""
+    return name.lower().replace(" ", "-")
+
+
+@dataclass(frozen=True)
+class ChannelInfo:
+    id: int
+    name: str
+    type: int
+    parent_id: int | None
+    position: int
+
+    @classmethod
+    def of(cls, channel: discord.abc.GuildChannel) -> "ChannelInfo":
+        return cls(channel.id, channel.name, channel.type.value, channel.category_id, channel.position)
+
+
+@dataclass(frozen=True)
+class RoleInfo:
+    id: int
+    name: str
+    position: int
+    managed: bool
+
+    @classmethod
+    def of(cls, role: discord.Role) -> "RoleInfo":
+        return cls(role.id, role.name, role.position, role.managed)
+
+
+class GuildState:
+    def __init__(self, guild_id: int, channels: list[ChannelInfo] = (), roles: list[RoleInfo] = ()):
+        self.guild_id = guild_id
+        self.updated_at = time.time()
+        self.channels: dict[int, ChannelInfo] = {}
+        self.roles: dict[int, RoleInfo] = {}
+        # IDs by (category ID, name) and by role name. Names are not unique on Discord.
+        self._channel_names: defaultdict[tuple[int | None, str], set[int]] = defaultdict(set)
+        self._role_names: defaultdict[str, set[int]] = defaultdict(set)
+        for channel in channels:
+            self.put_channel(channel)
+        for role in roles:
+            self.put_role(role)
+
+    @classmethod
+    def of(cls, guild: discord.Guild) -> "GuildState":
+        """Index the guild as it is in discord.py's cache."""
+        return cls(guild.id, [ChannelInfo.of(c) for c in guild.channels], [RoleInfo.of(r) for r in guild.roles])
+
+    def put_channel(self, channel: ChannelInfo) -> None:
+        self.remove_channel(channel.id)
+        self.channels[channel.id] = channel
+        self._channel_names[channel.parent_id, channel.name].add(channel.id)
+        self.updated_at = time.time()
+
+    def remove_channel(self, channel_id: int) -> None:
+        if old := self.channels.pop(channel_id, None):
+            self._channel_names[old.parent_id, old.name].discard(channel_id)
+            self.updated_at = time.time()
+
+    def put_role(self, role: RoleInfo) -> None:
+        self.remove_role(role.id)
+        self.roles[role.id] = role
+        self._role_names[role.name].add(role.id)
+        self.updated_at = time.time()
+
+    def remove_role(self, role_id: int) -> None:
+        if old := self.roles.pop(role_id, None):
+            self._role_names[old.name].discard(role_id)
+            self.updated_at = time.time()
+
+    def channels_named(self, name: str, parent_id: int | None) -> list[ChannelInfo]:
+        """Returns the channels called ``name`` (as Discord stores it) in the category, or outside any category."""
+        return [self.channels[i] for i in self._channel_names.get((parent_id, name), ())]
+
+    def roles_named(self, name: str) -> list[RoleInfo]:
+        return [self.roles[i] for i in self._role_names.get(name, ())]
+
+    def diff(self, other: "GuildState") -> str:
+        """Summarise what changed from ``other`` to this state, e.g. "2 channel(s) created, 1 role(s) edited"."""
+        changes = []
+        for kind, old, new in (("channel", other.channels, self.channels), ("role", other.roles, self.roles)):
+            counts = {
+                "created": len(new.keys() - old.keys()),
+                "deleted": len(old.keys() - new.keys()),
+                "edited": sum(old[i] != new[i] for i in old.keys() & new.keys()),
+            }
+            changes += [f"{count} {kind}(s) {change}" for change, count in counts.items() if count]
+        return ", ".join(changes) or "nothing changed"
+
+    def to_dict(self) -> dict:
+        return {
+            "guild_id": self.guild_id,
+            "updated_at": self.updated_at,
+            "channels": [asdict(c) for c in self.channels.values()],
+            "roles": [asdict(r) for r in self.roles.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GuildState":
+        state = cls(
+            data["guild_id"], [ChannelInfo(**c) for c in data["channels"]], [RoleInfo(**r) for r in data["roles"]]
+        )
+        state.updated_at = data["updated_at"]
+        return state
+
+
+class GuildStates:
+    """The state of every guild the bot is in, loaded from and snapshotted to ``directory``."""
+
+    def __init__(self, directory: Path = STATE_DIR, save_delay: float = SAVE_DELAY):
+        self.directory = directory
+        self.save_delay = save_delay
+        self._states: dict[int, GuildState] = {}
+        self._saves: dict[int, asyncio.Task] = {}
+
+    def path(self, guild_id: int) -> Path:
+        return self.directory / f"{guild_id}.json"
+
+    def get(self, guild_id: int) -> GuildState | None:
+        """Returns the guild's state, or its last snapshot if the guild has not been available yet."""
+        if guild_id not in self._states and (path := self.path(guild_id)).exists():
+            try:
+                self._states[guild_id] = GuildState.from_dict(json.loads(path.read_text(encoding="utf-8")))
+            except (ValueError, KeyError, TypeError):
+                log.warning(f"Ignoring unreadable guild state snapshot {path}")
+        return self._states.get(guild_id)
+
+    def __getitem__(self, guild: discord.Guild) -> GuildState:
+        """Returns the guild's state, indexing it from discord.py's cache if needed."""
+        if guild.id not in self._states:
+            self._states[guild.id] = GuildState.of(guild)
+        return self._states[guild.id]
+
+    def refresh(self, guild: discord.Guild) -> str:
+        """Re-index a guild that just became available. Returns what changed since the last snapshot."""
+        previous = self.get(guild.id)
+        self._states[guild.id] = GuildState.of(guild)
+        self.changed(guild.id)
+        return self._states[guild.id].diff(previous) if previous else "no snapshot"
+
+    def forget(self, guild_id: int) -> None:
+        self._states.pop(guild_id, None)
+        self.path(guild_id).unlink(missing_ok=True)
+
+    def changed(self, guild_id: int) -> None:
+        """Snapshot the guild's state once no more changes come in for ``save_delay`` seconds."""
+        if task := self._saves.get(guild_id):
+            task.cancel()
+        self._saves[guild_id] = asyncio.create_task(self._save_later(guild_id))
+
+    async def _save_later(self, guild_id: int) -> None:
+        await asyncio.sleep(self.save_delay)
+        del self._saves[guild_id]
+        self.save(guild_id)
+
+    def save(self, guild_id: int) -> None:
+        if (state := self._states.get(guild_id)) is None:
+            return
+        path = self.path(guild_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so a crash mid-write never leaves a truncated snapshot.
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state.to_dict(), ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
@@ -0,0 +1,214 @@
+"""
+Background jobs for long admin commands.
+
+A command hands its work to the bot's ``JobRunner`` and returns right away, so the work is no longer
+bound to the 15-minute lifetime of the interaction token. Each job posts a status message in the
+channel the command was used in and edits it as the job progresses and finishes; longer output
+(reports, files) is sent to the same channel. Jobs can be listed and cancelled with ``/jobs``.
+
+Progress is coalesced: ``update``, ``step`` and ``note`` only change the job's state, and the status
+message is edited at most once per ``BOT_JOB_PROGRESS_INTERVAL`` seconds with a rolling summary. Notes
+(warnings such as rejected emojis) are sent together in one report when the job finishes, so a job
+sends a constant number of messages however many items it processes.
+"""
+
+import asyncio
+import io
+import itertools
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+import discord
+
+from bot.constants import Bot as BotConfig
+from bot.metrics import metrics
+
+log = logging.getLogger()
+
+
+@dataclass
+class Job:
+    id: int
+    name: str
+    channel: discord.abc.Messageable
+    user: discord.abc.User
+    guild_id: int | None = None
+    status: str = "queued"
+    detail: str = ""
+    done: int = 0
+    total: int | None = None
+    latest: str = ""
+    notes: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    finished_at: float | None = None
+    message: discord.Message | None = None
+    task: asyncio.Task | None = None
+    interval: float = BotConfig.job_progress_interval
+    _edited_at: float = field(default=0.0, init=False, repr=False)
+    _flush: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def link(self) -> str:
+        """Where the job's progress is shown, for the reply to the command."""
+        return self.message.jump_url if self.message else self.channel.mention
+
+    def summary(self) -> str:
+        """Returns e.g. "Job #3 `dl setup` by @user: running for 12s", followed by its progress."""
+        lines = [f"Job #{self.id} `{self.name}` by {self.user.mention}: {self.status}"]
+        if self.started_at is not None:
+            lines[0] += f" {'after' if self.finished else 'for'} {self.elapsed:.0f}s"
+        if self.detail:
+            lines.append(self.detail + (f" {self.done}/{self.total}" if self.total and not self.finished else ""))
+        if self.latest and not self.finished:
+            lines.append(f"Latest: {self.latest}")
+        if self.notes:
+            lines.append(f"{len(self.notes)} warning(s), " + ("see below." if self.finished else "listed at the end."))
+        return "\n".join(lines)
+
+    def update(self, detail: str, total: int = None) -> None:
+        """Start a new stage of the job, e.g. ``update("Creating roles", total=len(dls))``."""
+        self.detail, self.done, self.total, self.latest = detail, 0, total, ""
+        self._changed()
+
+    def step(self, latest: str = "") -> None:
+        """Count one item of the current stage as done."""
+        self.done += 1
+        self.latest = latest or self.latest
+        self._changed()
+
+    def note(self, text: str) -> None:
+        """Add a warning to the report sent when the job finishes."""
+        self.notes.append(text)
+        self._changed()
+
+    async def send(self, content: str = None, **kwargs) -> discord.Message:
+        """Post output that does not fit in the status message, e.g. a report file."""
+        return await self.channel.send(content, **kwargs)
+
+    def _changed(self) -> None:
+        if self._flush is None:
+            self._flush = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._edited_at + self.interval - time.monotonic())
+        # Changes made while this edit is in flight schedule the next one.
+        self._flush = None
+        await self._edit()
+
+    async def _edit(self) -> None:
+        self._edited_at = time.monotonic()
+        try:
+            if self.message is None:
+                self.message = await self.channel.send(self.summary())
+            else:
+                await self.message.edit(content=self.summary())
+        except discord.HTTPException:
+            log.exception(f"Could not update the status message of job #{self.id}")
+
+    async def _finish(self) -> None:
+        """Show the final state and send the notes collected along the way."""
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        self.finished_at = time.monotonic()
+        await self._edit()
+        if not self.notes:
+            return
+        report = "\n".join(f"- {note}" for note in self.notes)
+        try:
+            if len(report) <= 1900:
+                await self.send(f"Warnings from job #{self.id}:\n{report}")
+            else:
+                file = discord.File(io.BytesIO(report.encode("utf-8")), filename=f"job-{self.id}-warnings.txt")
+                await self.send(f"Warnings from job #{self.id}:", file=file)
+        except discord.HTTPException:
+            log.exception(f"Could not send the warnings of job #{self.id}")
+
+
+class JobRunner:
+    """
+    Runs jobs in the background, at most ``concurrency`` at a time in each guild.
+
+    Guilds have their own slots, so a long rollover in one server never holds up jobs in another.
+    """
+
+    def __init__(self, concurrency: int = BotConfig.job_concurrency):
+        self.jobs: dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._slots: defaultdict[int | None, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(concurrency))
+
+    async def submit(
+        self,
+        name: str,
+        interaction: discord.Interaction,
+        work: Callable[[Job], Awaitable[str | None]],
+    ) -> Job:
+        """
+        Queue ``work``, post the job's status message in the interaction's channel and answer the interaction
+        with a link to it.
+
+        The interaction is deferred first (unless the command already did), since the status message can
+        be held up by rate limits for longer than Discord waits for an answer.
+        ``work`` receives the job to report progress with, and returns the final detail to show.
+        """
+        if not interaction.response.is_done():
+            await interaction.response.defer(thinking=True)
+        job = Job(next(self._ids), name, interaction.channel, interaction.user, interaction.guild_id)
+        self.jobs[job.id] = job
+        await job._edit()
+        job.task = asyncio.create_task(self._run(job, work), name=f"job-{job.id}")
+        await interaction.followup.send(f"Started job #{job.id}, progress: {job.link}")
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[str | None]]) -> None:
+        try:
+            async with self._slots[job.guild_id]:
+                job.status, job.started_at = "running", time.monotonic()
+                await job._edit()
+                result = await work(job)
+            job.status = "done"
+            if result:
+                job.detail = result
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            log.exception(f"Job #{job.id} ({job.name}) failed")
+            job.status, job.detail = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            metrics.observe_job(job.name, job.elapsed, failed=job.status == "failed")
+            await job._finish()
+
+    def get(self, job_id: int, guild_id: int | None) -> Job | None:
+        """Returns the job if it was started in the guild."""
+        job = self.jobs.get(job_id)
+        return job if job and job.guild_id == guild_id else None
+
+    def in_guild(self, guild_id: int | None) -> list[Job]:
+        """Returns the guild's jobs, most recent first."""
+        return sorted((job for job in self.jobs.values() if job.guild_id == guild_id), key=lambda j: j.id, reverse=True)
+
+    def cancel(self, job_id: int, guild_id: int | None) -> bool:
+        """Cancel a queued or running job of the guild. Returns whether there was anything to cancel."""
+        job = self.get(job_id, guild_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    async def join(self) -> None:
+        """Wait for every submitted job to finish."""
+        await asyncio.gather(*(job.task for job in self.jobs.values()), return_exceptions=True)
@@ -0,0 +1,70 @@
+"""
+Crash-safe journal of the mutations made by long-running commands.
+
+Every completed mutation (role created, channel moved, reaction added, ...) is committed to a local
+SQLite database as soon as Discord confirms it. If the bot restarts or the interaction expires halfway
+through, re-running the same command with the same arguments picks up the journal and skips the work
+that was already done. A job's entries are dropped once it finishes.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+
+from bot.constants import Bot as BotConfig
+
+log = logging.getLogger()
+
+JOURNAL_PATH = BotConfig.data_dir / "journal.sqlite3"
+
+
+class Journal:
+    def __init__(self, job: str, path: Path = JOURNAL_PATH):
+        self.job = job
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit, so each record is durable as soon as it is written.
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS mutations ("
+            " job TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+            " PRIMARY KEY (job, key))"
+        )
+        done = len(self.entries())
+        self.resumed = done > 0
+        if self.resumed:
+            log.info(f"Resuming job {job} from {done} journaled mutation(s)")
+
+    def get(self, key: str) -> str | None:
+        """Returns the value recorded for ``key``, or ``None`` if that mutation has not happened yet."""
+        row = self._db.execute("SELECT value FROM mutations WHERE job = ? AND key = ?", (self.job, key)).fetchone()
+        return row and row[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def entries(self, prefix: str = "") -> dict[str, str]:
+        """Returns every recorded ``key: value`` whose key starts with ``prefix``."""
+        rows = self._db.execute(
+            "SELECT key, value FROM mutations WHERE job = ? AND substr(key, 1, ?) = ?",
+            (self.job, len(prefix), prefix),
+        )
+        return dict(rows)
+
+    def record(self, key: str, value: str | int = "") -> None:
+        """Record that the mutation ``key`` completed, e.g. ``record("role:dduck@sfsu.edu", role.id)``."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO mutations (job, key, value) VALUES (?, ?, ?)", (self.job, key, str(value))
+        )
+
+    def forget(self, prefix: str) -> None:
+        """Drop the records whose key starts with ``prefix``, e.g. after the mutations were undone."""
+        self._db.execute(
+            "DELETE FROM mutations WHERE job = ? AND substr(key, 1, ?) = ?", (self.job, len(prefix), prefix)
+        )
+
+    def finish(self) -> None:
+        """Mark the job as complete. A later run with the same job name starts from scratch."""
+        self.forget("")
+        self._db.close()
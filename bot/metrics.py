@@ -0,0 +1,131 @@
+"""
+In-process latency and rate-limit metrics, rendered in the Prometheus text format.
+
+REST traffic is observed through an aiohttp ``TraceConfig`` handed to discord.py's HTTP client, so
+every request is timed per route without touching discord.py's internals. Rate-limit sleeps are
+derived from the response headers: discord.py sleeps for ``X-RateLimit-Reset-After`` once a bucket
+is exhausted, and for ``Retry-After`` after a ``429``.
+"""
+
+import bisect
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import aiohttp
+
+# Seconds. Commands such as /dl setup can run for minutes, hence the long tail.
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket containing the ``q`` quantile."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+
+def route_name(path: str) -> str:
+    """Returns the route of a request path, e.g. "/channels/{id}/messages/{id}"."""
+    parts = path.removeprefix("/api/v10").split("/")
+    for i, part in enumerate(parts):
+        if i > 0 and parts[i - 1] == "reactions":
+            parts[i] = "{emoji}"
+        elif i > 1 and parts[i - 2] in ("webhooks", "interactions"):
+            parts[i] = "{token}"
+        elif part.isdigit():
+            parts[i] = "{id}"
+    return "/".join(parts)
+
+
+class Metrics:
+    def __init__(self):
+        self.commands: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.command_errors: defaultdict[str, int] = defaultdict(int)
+        # Background jobs by name, from the start of their work to the end; commands only time submitting them.
+        self.jobs: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.job_errors: defaultdict[str, int] = defaultdict(int)
+        self.routes: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.rate_limited = 0
+        self.rate_limit_sleep = 0.0
+        self.heartbeat_latency = float("nan")
+
+    def observe_command(self, name: str, seconds: float, failed: bool = False) -> None:
+        self.commands[name].observe(seconds)
+        if failed:
+            self.command_errors[name] += 1
+
+    def observe_job(self, name: str, seconds: float, failed: bool = False) -> None:
+        self.jobs[name].observe(seconds)
+        if failed:
+            self.job_errors[name] += 1
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Returns a trace config that records every request made through the session it is attached to."""
+
+        async def on_request_start(session, context: SimpleNamespace, params: aiohttp.TraceRequestStartParams):
+            context.start = time.perf_counter()
+
+        async def on_request_end(session, context: SimpleNamespace, params: aiohttp.TraceRequestEndParams):
+            route = f"{params.method} {route_name(params.url.path)}"
+            self.routes[route].observe(time.perf_counter() - context.start)
+            headers = params.response.headers
+            if params.response.status == 429:
+                self.rate_limited += 1
+                self.rate_limit_sleep += float(headers.get("Retry-After", 0))
+            elif headers.get("X-RateLimit-Remaining") == "0":
+                self.rate_limit_sleep += float(headers.get("X-RateLimit-Reset-After", 0))
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name: str, label: str, histograms: dict[str, Histogram]):
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in sorted(histograms.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else bound
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {h.sum}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {h.count}')
+
+        histogram("qwacker_command_duration_seconds", "command", self.commands)
+        lines.append("# TYPE qwacker_command_errors_total counter")
+        lines += [f'qwacker_command_errors_total{{command="{k}"}} {v}' for k, v in sorted(self.command_errors.items())]
+        histogram("qwacker_job_duration_seconds", "job", self.jobs)
+        lines.append("# TYPE qwacker_job_errors_total counter")
+        lines += [f'qwacker_job_errors_total{{job="{k}"}} {v}' for k, v in sorted(self.job_errors.items())]
+        histogram("qwacker_rest_request_duration_seconds", "route", self.routes)
+        lines += [
+            "# TYPE qwacker_rest_rate_limited_total counter",
+            f"qwacker_rest_rate_limited_total {self.rate_limited}",
+            "# TYPE qwacker_rest_rate_limit_sleep_seconds_total counter",
+            f"qwacker_rest_rate_limit_sleep_seconds_total {self.rate_limit_sleep}",
+            "# TYPE qwacker_gateway_heartbeat_latency_seconds gauge",
+            f"qwacker_gateway_heartbeat_latency_seconds {self.heartbeat_latency}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
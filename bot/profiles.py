@@ -0,0 +1,42 @@
+"""
+Runtime profiles for the gateway connection and caches, selected with ``BOT_PROFILE``.
+
+None of the cogs read message content or rely on cached messages: commands get their channels,
+roles and attachments from the interaction and guild cache, messages are fetched when needed, and
+reaction roles are driven by raw reaction events. The lean profile therefore only subscribes to guild
+and guild reaction events and keeps no message cache. Members are not cached by either profile, as
+``Intents.default()`` does not include the privileged members intent; the memory saved comes from
+not receiving message events and not caching their messages.
+"""
+
+from typing import Any
+
+import discord
+
+
+def lean() -> dict[str, Any]:
+    return dict(
+        intents=discord.Intents(guilds=True, guild_reactions=True),
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        max_messages=None,
+        chunk_guilds_at_startup=False,
+    )
+
+
+def default() -> dict[str, Any]:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    return dict(
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+        max_messages=1000,
+        chunk_guilds_at_startup=intents.members,
+    )
+
+
+PROFILES = {"lean": lean, "default": default}
+
+
+def client_options(profile: str) -> dict[str, Any]:
+    """Returns the ``Client`` keyword arguments for the named profile."""
+    return PROFILES[profile]()
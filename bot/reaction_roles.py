@@ -0,0 +1,134 @@
+"""
+Reaction roles: reacting to a bound message grants a role, removing the reaction takes it away.
+
+``RoleIndex`` maps ``(message ID, emoji)`` to a role. It lives in memory so the gateway handlers
+never touch the disk, and is written through to ``data/reaction_roles.sqlite3`` whenever a command
+binds a message, so it is rebuilt as-is when the bot starts.
+
+``RoleQueue`` applies the resulting role changes. Changes are held per member for ``delay`` seconds
+and netted out, so a quick add/remove toggle costs no API call at all and add/remove/add costs one.
+The remaining calls go through a ``RestScheduler``: each member's changes are applied in order, and
+different members' changes run concurrently, with discord.py holding calls back once the guild's
+member-role rate limit is used up.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from pathlib import Path
+
+import discord
+
+from bot.constants import Bot as BotConfig
+from bot.emojis import normalize
+from bot.rest import RestScheduler, bucket
+
+log = logging.getLogger()
+
+INDEX_PATH = BotConfig.data_dir / "reaction_roles.sqlite3"
+
+
+class RoleIndex:
+    def __init__(self, path: Path = INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reaction_roles ("
+            " message_id INTEGER NOT NULL, emoji TEXT NOT NULL, role_id INTEGER NOT NULL,"
+            " PRIMARY KEY (message_id, emoji))"
+        )
+        rows = self._db.execute("SELECT message_id, emoji, role_id FROM reaction_roles")
+        self._roles: dict[tuple[int, str], int] = {(message_id, emoji): role_id for message_id, emoji, role_id in rows}
+        log.info(f"Loaded {len(self._roles)} reaction role(s)")
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def get(self, message_id: int, emoji: discord.PartialEmoji | str) -> int | None:
+        """Returns the role bound to ``emoji`` on the message, if any."""
+        return self._roles.get((message_id, normalize(str(emoji))))
+
+    def bind(self, message_id: int, roles: dict[str, int]) -> None:
+        """Replace the reaction roles of a message with ``roles``, a mapping of emoji to role ID."""
+        roles = {normalize(emoji): role_id for emoji, role_id in roles.items()}
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM reaction_roles WHERE message_id = ?", (message_id,))
+            self._db.executemany(
+                "INSERT INTO reaction_roles (message_id, emoji, role_id) VALUES (?, ?, ?)",
+                [(message_id, emoji, role_id) for emoji, role_id in roles.items()],
+            )
+        self._roles = {key: role for key, role in self._roles.items() if key[0] != message_id}
+        self._roles |= {(message_id, emoji): role_id for emoji, role_id in roles.items()}
+
+    def unbind(self, message_id: int) -> None:
+        """Stop handling reactions on the message."""
+        self.bind(message_id, {})
+
+    def bound(self, message_id: int) -> dict[str, int]:
+        """Returns the reaction roles of a message, by emoji."""
+        return {emoji: role_id for (message, emoji), role_id in self._roles.items() if message == message_id}
+
+    def forget_roles(self, role_ids: set[int]) -> None:
+        """Drop every binding to the given roles, e.g. after they were deleted."""
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM reaction_roles WHERE role_id = ?", [(role_id,) for role_id in role_ids])
+        self._roles = {key: role for key, role in self._roles.items() if role not in role_ids}
+
+
+class RoleQueue:
+    def __init__(self, http: discord.http.HTTPClient, delay: float = BotConfig.reaction_role_delay):
+        self.http = http
+        self.delay = delay
+        # Every call hits the guild's member-role rate limit, so keep as few in flight as /teardown's member edits.
+        self.scheduler = RestScheduler(concurrency=BotConfig.member_edit_concurrency)
+        # Net change per role of each member with changes waiting: +1 to add, -1 to remove, 0 for no-op.
+        self._pending: dict[tuple[int, int], dict[int, int]] = {}
+        self._flushes: set[asyncio.Task] = set()
+        self.received = 0
+        self.collapsed = 0
+
+    def push(self, guild_id: int, user_id: int, role_id: int, add: bool) -> None:
+        """Queue adding or removing a role, to be applied together with the member's other changes."""
+        self.received += 1
+        key = (guild_id, user_id)
+        if key not in self._pending:
+            self._pending[key] = {}
+            task = asyncio.create_task(self._flush(key))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        changes = self._pending[key]
+        # Reaction events for one member and emoji alternate, so the net change is always -1, 0 or +1.
+        changes[role_id] = max(-1, min(1, changes.get(role_id, 0) + (1 if add else -1)))
+
+    async def _flush(self, key: tuple[int, int]) -> None:
+        await asyncio.sleep(self.delay)
+        guild_id, user_id = key
+        changes = self._pending.pop(key)
+        calls = []
+        for role_id, net in changes.items():
+            if net == 0:
+                self.collapsed += 1
+                continue
+            method = self.http.add_role if net > 0 else self.http.remove_role
+            # A member's adds and removes share one bucket, so a later change can never overtake an earlier one.
+            calls.append(
+                (
+                    bucket(f"PUT/DELETE /guilds/{guild_id}/members/roles", user_id),
+                    lambda method=method, role_id=role_id: self._apply(method, guild_id, user_id, role_id),
+                )
+            )
+        await self.scheduler.gather(calls)
+
+    async def _apply(self, method, guild_id: int, user_id: int, role_id: int) -> None:
+        try:
+            await method(guild_id, user_id, role_id, reason="Reaction role")
+        except discord.HTTPException as e:
+            # e.g. the member left, or the role was deleted or is above the bot's.
+            log.warning(f"Could not update role {role_id} of member {user_id}: {e}")
+
+    async def join(self) -> None:
+        """Wait until every queued change has been applied."""
+        while self._flushes:
+            await asyncio.gather(*self._flushes)
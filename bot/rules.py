@@ -0,0 +1,93 @@
+"""
+The rules message, rendered from a template, and the record of where it was posted.
+
+The message is described by ``bot/data/rules.json``, a payload with ``content`` and ``embeds`` in
+Discord's format that is kept under version control. Its hash identifies the version of the rules.
+
+``RulesPosts`` remembers every rules message the bot posted or edited, with the hash of the template
+it shows, in ``data/rules.sqlite3``. Updating a post that already shows the current template then
+costs no API call, and once the template changes, the stale posts are known without fetching any.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+import discord
+
+from bot.constants import Bot as BotConfig
+
+log = logging.getLogger()
+
+TEMPLATE_PATH = Path(__file__).parent / "data" / "rules.json"
+POSTS_PATH = BotConfig.data_dir / "rules.sqlite3"
+REACTION = "👍"
+
+
+@dataclass(frozen=True)
+class RulesTemplate:
+    content: str
+    embeds: list[discord.Embed]
+    digest: str
+
+    @classmethod
+    def load(cls, path: Path = TEMPLATE_PATH) -> "RulesTemplate":
+        """Read the template. It is small enough to be read on every command, so edits apply without a restart."""
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        embeds = [discord.Embed.from_dict(embed) for embed in payload.get("embeds", [])]
+        return cls(payload.get("content", ""), embeds, digest)
+
+    @property
+    def version(self) -> str:
+        """A short form of the hash, e.g. ``1a2b3c4d``, to show in replies."""
+        return self.digest[:8]
+
+
+@dataclass(frozen=True)
+class RulesPost:
+    message_id: int
+    channel_id: int
+    guild_id: int
+    digest: str
+
+
+class RulesPosts:
+    def __init__(self, path: Path = POSTS_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rules_posts ("
+            " message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, guild_id INTEGER NOT NULL,"
+            " digest TEXT NOT NULL)"
+        )
+
+    def get(self, message_id: int, guild_id: int) -> RulesPost | None:
+        """Returns the post if it is in the guild, so a command can only reach its own guild's posts."""
+        row = self._db.execute(
+            "SELECT message_id, channel_id, guild_id, digest FROM rules_posts WHERE message_id = ? AND guild_id = ?",
+            (message_id, guild_id),
+        ).fetchone()
+        return row and RulesPost(*row)
+
+    def stale(self, guild_id: int, digest: str) -> list[RulesPost]:
+        """Returns the guild's posts that do not show the template with hash ``digest``."""
+        rows = self._db.execute(
+            "SELECT message_id, channel_id, guild_id, digest FROM rules_posts WHERE guild_id = ? AND digest != ?",
+            (guild_id, digest),
+        )
+        return [RulesPost(*row) for row in rows]
+
+    def record(self, post: RulesPost) -> None:
+        """Record that the message shows the template with hash ``post.digest`` and has the reaction."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO rules_posts (message_id, channel_id, guild_id, digest) VALUES (?, ?, ?, ?)",
+            (post.message_id, post.channel_id, post.guild_id, post.digest),
+        )
+
+    def forget(self, message_id: int) -> None:
+        """Stop tracking a post, e.g. after it was deleted."""
+        self._db.execute("DELETE FROM rules_posts WHERE message_id = ?", (message_id,))